@@ -1,21 +1,30 @@
 from __future__ import annotations
 
 import copy
-from datetime import timedelta
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from math import sqrt
 from random import random
-from tkinter import Tk, Canvas, Event
+from tkinter import Tk, Canvas, Event, HIDDEN, NORMAL, NW
 import time
-from timeloop import Timeloop
 
 from geometry import geometry_options
 from geometry.camera import Camera
 from geometry.mesh import Mesh
 from geometry.quaternion import Quaternion
 from geometry.vector import Vector
+from input_state import InputState
 from options import options
-from rendering.collectorStep import CollectorStep
+from rendering.canvas_renderer import CanvasRenderer
+from rendering.cullingStep import CullingStep
+from rendering.drawListStep import DrawListStep
+from rendering.frame_profiler import FrameProfiler
+from rendering.frame_scheduler import FrameScheduler
+from rendering.photo_renderer import PhotoRenderer
 from rendering.pipeline import Pipeline
+from rendering.projectionStep import ProjectionStep
+from rendering.rasterStep import RasterStep
+from scene.animation import Spin
 from scene.entity import Entity
 from scene.scene import Scene
 from shape.cube import Cube
@@ -25,241 +34,264 @@ geometry_options.line_thickness = 1
 
 windowCenter = Vector(x=options.width / 2, y=options.height / 2, z=0)
 
-origin = Vector(x=options.originOffset, y=options.originOffset, z=options.originOffset)
-
-m = Mesh().import_from("ressources/Cylinder.obj")
-m.scale(20)
-m.rotate(rotation=Quaternion.axis_angle(Vector(y=1), 180))
-cubeSize = 20
-plane = Plane(length=4, grid_size=20.0)
-plane.translate(Vector(x=-cubeSize, y=-cubeSize, z=cubeSize))
-cube = Cube(cube_size=cubeSize)
-meshes = [
-    cube,
-    m,
-    plane,
-    plane.copy().rotate(rotation=Quaternion.axis_angle(Vector(x=1), angle=-90)),
-    plane.copy().rotate(rotation=Quaternion.axis_angle(Vector(y=1), angle=90)),
-    # cube,
-    # Cube(cube_size=cubeSize / 2, origin=Vector(y=(cubeSize + cubeSize / 2))),
-    # Cube(cube_size=cubeSize / 2, origin=Vector(y=-(cubeSize + cubeSize / 2))),
-    # Cube(cube_size=cubeSize / 2, origin=Vector(x=(cubeSize + cubeSize / 2))),
-    # Cube(cube_size=cubeSize / 2, origin=Vector(x=-(cubeSize + cubeSize / 2))),
-    # Cube(cube_size=cubeSize / 2, origin=Vector(z=(cubeSize + cubeSize / 2))),
-    # Cube(cube_size=cubeSize / 2, origin=Vector(z=-(cubeSize + cubeSize / 2))),
-]
-[m.translate(origin) for m in meshes]
-entities = [Entity(geometry=m) for m in meshes]
-m.translate(Vector(x=cubeSize*2))
-
-scene = Scene()
-[scene.scene_root.add_entity(e) for e in entities]
-
-rot_speed = 180 / options.tickRate  # deg/s = rot speed/tick
-cube_rot_axis = Vector(x=random(), y=random(), z=random())
-point2 = cube_rot_axis.copy() * 100
-point1 = -point2
-rotationSpeeds = [
-    # None,
-    # None,
-    # None,
-    # Quaternion.axis_angle(cube_rot_axis, angle=rot_speed),
-    # Quaternion.axis_angle(Vector(x=1), angle=-rot_speed),
-    # Quaternion.axis_angle(Vector(x=1), angle=rot_speed),
-    # Quaternion.axis_angle(Vector(y=1), angle=rot_speed),
-    # Quaternion.axis_angle(Vector(y=1), angle=-rot_speed),
-    # Quaternion.axis_angle(Vector(z=1), angle=rot_speed),
-    # Quaternion.axis_angle(Vector(z=1), angle=-rot_speed),
-]
-
-camera_origin = cube.center + Vector(z=-cubeSize * 4)
-camera = Camera(position=camera_origin, focal_length=500, viewport_offset=windowCenter)
-camera_speed = 1.5
-
-frames = 0
-fps = 0
-
-pipeline = Pipeline(steps=[
-    CollectorStep(),
-])
-
-tl = Timeloop()
-
-
-@tl.job(interval=timedelta(milliseconds=options.refresh_delay / 2))
-def update_view():
-    local_scene = scene.copy()
-    ent = local_scene.entities()
-    mhs = [entity.geometry for entity in ent]
-
-    for idx, mesh in enumerate(mhs):
-        mesh.project_to(camera=camera)
-
-    pipeline.push_scene(scene=local_scene)
-
-
-last_scene = None
-
-
-def draw():
-    global frames, last_scene
-
-    b_pull = time.time()
-    new_scene = pipeline.pull_scene()
-    if new_scene is not None:
-        last_scene = new_scene
-    # print("pull time = {:.6}ms".format((time.time() - b_pull) * 1000))
-
-    if last_scene is None:
-        canvas.after(ms=10, func=draw)
+move_keys = {
+    "w": Vector(z=1),
+    "s": Vector(z=-1),
+    "a": Vector(x=-1),
+    "d": Vector(x=1),
+    "space": Vector(y=1),
+    "shift_l": Vector(y=-1),
+}
+turn_keys = {
+    "up": Vector(x=-1),
+    "down": Vector(x=1),
+    "left": Vector(y=-1),
+    "right": Vector(y=1),
+    "q": Vector(z=1),
+    "e": Vector(z=-1),
+}
+zoom_keys = {
+    "prior": Vector(z=1),
+    "next": Vector(z=-1),
+}
+
+
+def request_redraw():
+    global pushed_state
+    pushed_state = None
+
+
+def push_snapshot(alpha: float):
+    global pushed_state
+    if pipeline.busy():
+        return  # the next snapshot is taken once this one is drawn, rather than queued and dropped
+    # animations are sampled between the last tick and the next one
+    render_time = scheduler.time + alpha * scheduler.tick
+    # an unchanged camera and scene would only reproduce the frame already on screen
+    state = (camera.version, scene.version(), render_time if scene.animator.animations else None)
+    if state == pushed_state:
         return
+    pushed_state = state
 
-    b_extract = time.time()
-    msh = [entity.geometry for entity in last_scene.entities()]
-    # print("extract time = {:.6}ms".format((time.time() - b_extract) * 1000))
-
-    canvas.delete("all")
-
-    b_draw = time.time()
-
-    for mesh in msh:
-        m_draw = time.time()
-        mesh.draw(canvas, options.debug)
-        # print("mesh draw time = {:.6}ms".format((time.time() - m_draw) * 1000))
-
-    if options.draw_fps:
-        canvas.create_text(20, 10, text=fps)
-
-    canvas.create_line(windowCenter.x, windowCenter.y - options.cross_hair_scale,
-                       windowCenter.x, windowCenter.y + options.cross_hair_scale,
-                       width=2)
-    canvas.create_line(windowCenter.x - options.cross_hair_scale, windowCenter.y,
-                       windowCenter.x + options.cross_hair_scale, windowCenter.y,
-                       width=2)
-    if options.debug:
-        canvas.create_text(145, 40, text="{}".format(camera))
-    # print("draw time = {:.6}ms".format((time.time() - b_draw) * 1000))
-
-    frames += 1
-
-    # print("full draw time = {:.6}ms\n---------------------------------".format((time.time() - b_draw) * 1000))
-
-    canvas.after(ms=1, func=draw)
-
-
-@tl.job(interval=timedelta(milliseconds=options.tick_delay))
-def update_world():
-    for idx, mesh in enumerate(meshes):
-        if idx > len(rotationSpeeds) - 1:
-            break
-        if rotationSpeeds[idx] is None:
-            continue
-        mesh.rotate(rotation=rotationSpeeds[idx])
-
-
-@tl.job(interval=timedelta(seconds=1))
-def fps_counter():
-    global fps, frames
-    fps = frames
-    frames = 0
-
-
-def move_camera(direction: Vector):
-    def mover(_: Event):
-        camera.translate(direction, options.global_movement)
-
-    return mover
-
-
-def rotate_camera(axis: Vector, angle: float):
-    def mover(_: Event):
-        camera.rotate(axis, angle)
+    start = time.perf_counter()
+    snapshot = scene.snapshot(camera=camera, time=render_time)
+    snapshot.timings["snapshot"] = time.perf_counter() - start
+    pipeline.push_scene(scene=snapshot)
 
-    return mover
 
+def draw(alpha: float):
+    global frames, fps, fps_since, last_scene, last_draw_end, last_stats_update
 
-previous_position = None
-
-mouse_deadzone = 10
-
-
-def follow_mouse(event: Event):
-    global previous_position
-
-    move = Vector(x=event.x, y=event.y)
-
-    if move.is_same(windowCenter):
-        return
-
-    offset = move - windowCenter
-
-    if offset.magnitude() < mouse_deadzone:
-        return
-
-    offset = offset.normalize()
-
-    axis = Vector()
-    if offset.x < 0:
-        camera.rotate(Vector(y=1), camera_speed * offset.x, True)
-        axis.y = -1
-    elif offset.x > 0:
-        camera.rotate(Vector(y=1), camera_speed * offset.x, True)
-        axis.y = 1
-
-    if offset.y < 0:
-        camera.rotate(Vector(x=1), camera_speed * offset.y)
-        axis.x = -1
-    elif offset.y > 0:
-        camera.rotate(Vector(x=1), camera_speed * offset.y)
-        axis.x = 1
-
-    tk.event_generate('<Motion>', warp=True, x=windowCenter.x, y=windowCenter.y)
-
+    b_pull = time.perf_counter()
+    new_scene = pipeline.pull_scene()
+    if new_scene is not None:
+        last_scene = new_scene
+    push_snapshot(alpha)
+    b_canvas = time.perf_counter()  # the next snapshot is timed on its own
 
-def adjust_viewport(amount: float):
-    def mover(_: Event):
-        camera.view_port.translate(Vector(z=amount))
+    if new_scene is not None:
+        if options.renderer == "raster":
+            renderer.render(last_scene.frame)
+        else:
+            renderer.render(last_scene.draw_list, options.debug)
+            renderer.render_polygons(last_scene.polygons)
+        canvas.itemconfigure(camera_text, text="{}".format(last_scene.camera),
+                             state=NORMAL if options.debug else HIDDEN)
+        if options.debug:
+            target = last_scene.pick(windowCenter.x, windowCenter.y)  # entity under the crosshair
+            canvas.itemconfigure(target_text, state=NORMAL,
+                                 text="target: none" if target is None else "target: entity {} at {:.1f}".format(
+                                     target[0].uid, target[1]))
+        else:
+            canvas.itemconfigure(target_text, state=HIDDEN)
+        canvas.tag_raise(overlay_tag)
+        frames += 1
+
+    draw_end = time.perf_counter()
+    if draw_end - fps_since >= 1:
+        fps = frames
+        frames = 0
+        fps_since = draw_end
+    canvas.itemconfigure(fps_text, text=fps, state=NORMAL if options.draw_fps else HIDDEN)
 
-    return mover
+    if new_scene is not None:
+        new_scene.timings["canvas"] = draw_end - b_canvas
+        new_scene.timings["tk_idle"] = b_pull - last_draw_end
+        profiler.record_frame(new_scene.timings, pipeline.dropped())
+    last_draw_end = draw_end
+
+    if options.debug and draw_end - last_stats_update > 0.5:
+        canvas.itemconfigure(stats_text, text=profiler.overlay_text(), state=NORMAL)
+        last_stats_update = draw_end
+    elif not options.debug:
+        canvas.itemconfigure(stats_text, state=HIDDEN)
+
+
+def apply_input(dt: float):
+    # everything that happened since the last tick moves the camera once, whatever the event rate
+    move = input_state.direction(move_keys)
+    if not move.is_same(Vector()):
+        camera.translate(move.imul(options.move_speed * dt), options.global_movement)
+
+    zoom = input_state.direction(zoom_keys)
+    if zoom.z != 0:
+        camera.move_view_port(zoom.imul(options.zoom_speed * dt))
+
+    turn = input_state.direction(turn_keys)
+    local_rotation = None
+    if not turn.is_same(Vector()):
+        local_rotation = Quaternion.axis_angle(turn, options.turn_speed * dt)
+
+    x, y = input_state.take_pointer_offset()
+    global_rotation = None
+    if x != 0:
+        global_rotation = Quaternion.axis_angle(Vector(y=1), options.mouse_sensitivity * x)
+    if y != 0:
+        pitch = Quaternion.axis_angle(Vector(x=1), options.mouse_sensitivity * y)
+        local_rotation = pitch if local_rotation is None else local_rotation * pitch
+    if x != 0 or y != 0:
+        tk.event_generate('<Motion>', warp=True, x=windowCenter.x, y=windowCenter.y)
+
+    if global_rotation is not None or local_rotation is not None:
+        camera.turn(global_rotation=global_rotation, local_rotation=local_rotation)
 
 
 def toggle_info(_: Event):
     options.debug = not options.debug
+    request_redraw()
 
 
 def toggle_fps(_: Event):
     options.draw_fps = not options.draw_fps
 
 
-view_up = rotate_camera(axis=Vector(x=-1), angle=camera_speed)
-view_down = rotate_camera(axis=Vector(x=1), angle=camera_speed)
-view_left = rotate_camera(axis=Vector(y=-1), angle=camera_speed)
-view_right = rotate_camera(axis=Vector(y=1), angle=camera_speed)
-
-tk = Tk()
-tk.config(cursor="none")
-canvas = Canvas(tk, width=options.width, height=options.height)
-canvas.pack()
-
-tk.bind(sequence="w", func=move_camera(Vector(z=camera_speed)))
-tk.bind(sequence="s", func=move_camera(Vector(z=-camera_speed)))
-tk.bind(sequence="a", func=move_camera(Vector(x=-camera_speed)))
-tk.bind(sequence="d", func=move_camera(Vector(x=camera_speed)))
-tk.bind(sequence="<Left>", func=view_left)
-tk.bind(sequence="<Right>", func=view_right)
-tk.bind(sequence="<Up>", func=view_up)
-tk.bind(sequence="<Down>", func=view_down)
-tk.bind(sequence="q", func=rotate_camera(axis=Vector(z=1), angle=camera_speed))
-tk.bind(sequence="e", func=rotate_camera(axis=Vector(z=1), angle=-camera_speed))
-tk.bind(sequence="<space>", func=move_camera(Vector(y=camera_speed)))
-tk.bind(sequence="<Shift_L>", func=move_camera(Vector(y=-camera_speed)))
-tk.bind(sequence="<Prior>", func=adjust_viewport(camera_speed))
-tk.bind(sequence="<Next>", func=adjust_viewport(-camera_speed))
-tk.bind(sequence="<Motion>", func=follow_mouse)
-tk.bind(sequence="i", func=toggle_info)
-tk.bind(sequence="f", func=toggle_fps)
-
-tl.start()
-tk.after(ms=100, func=draw)
-tk.mainloop()
-pipeline.stop()
+def dump_frame_times(_: Event):
+    profiler.dump_csv(options.frame_times_csv)
+
+
+def toggle_solid(_: Event):
+    options.solid = not options.solid
+    draw_list_step.solid = options.solid
+    request_redraw()
+
+
+if __name__ == "__main__":
+    origin = Vector(x=options.originOffset, y=options.originOffset, z=options.originOffset)
+
+    m = Mesh().import_from("ressources/Cylinder.obj")
+    m.scale(20)
+    m.rotate(rotation=Quaternion.axis_angle(Vector(y=1), 180))
+    cubeSize = 20
+    plane = Plane(length=4, grid_size=20.0)
+    plane.translate(Vector(x=-cubeSize, y=-cubeSize, z=cubeSize))
+    cube = Cube(cube_size=cubeSize)
+    small_cube = Cube(cube_size=cubeSize / 2)  # instances share its buffers
+    meshes = [
+        cube,
+        m,
+        plane,
+        plane.copy().rotate(rotation=Quaternion.axis_angle(Vector(x=1), angle=-90)),
+        plane.copy().rotate(rotation=Quaternion.axis_angle(Vector(y=1), angle=90)),
+        # cube,
+        # small_cube.instance(position=Vector(y=(cubeSize + cubeSize / 2))),
+        # small_cube.instance(position=Vector(y=-(cubeSize + cubeSize / 2))),
+        # small_cube.instance(position=Vector(x=(cubeSize + cubeSize / 2))),
+        # small_cube.instance(position=Vector(x=-(cubeSize + cubeSize / 2))),
+        # small_cube.instance(position=Vector(z=(cubeSize + cubeSize / 2))),
+        # small_cube.instance(position=Vector(z=-(cubeSize + cubeSize / 2))),
+    ]
+    [m.translate(origin) for m in meshes]
+    entities = [Entity(geometry=m) for m in meshes]
+    m.translate(Vector(x=cubeSize*2))
+
+    scene = Scene()
+    [scene.scene_root.add_entity(e) for e in entities]
+
+    rot_speed = 180  # deg/s
+    cube_rot_axis = Vector(x=random(), y=random(), z=random())
+    point2 = cube_rot_axis.copy() * 100
+    point1 = -point2
+    rotationSpeeds = [  # one per entry of meshes, None stays still
+        Spin(cube_rot_axis, rot_speed),
+        Spin(Vector(y=1), -rot_speed),
+    ]
+    if options.spin:
+        # evaluated on each snapshot, the meshes themselves are never rotated
+        [scene.animate(entities[idx], spin)
+         for idx, spin in enumerate(rotationSpeeds[:len(meshes)]) if spin is not None]
+
+    camera_origin = cube.center + Vector(z=-cubeSize * 4)
+    camera = Camera(position=camera_origin, focal_length=500, viewport_offset=windowCenter)
+
+    frames = 0
+    fps = 0
+
+    projection_executor = None
+    if options.projection_workers > 0:
+        if options.projection_processes:
+            # spawned workers only import this module, forking would copy the Tk and pipeline threads' state
+            projection_executor = ProcessPoolExecutor(max_workers=options.projection_workers,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+        else:
+            projection_executor = ThreadPoolExecutor(max_workers=options.projection_workers)
+
+    draw_list_step = DrawListStep(solid=options.solid)
+    if options.renderer == "raster":
+        render_steps = [RasterStep(width=options.width, height=options.height)]
+    else:
+        render_steps = [CullingStep(camera=camera), draw_list_step]
+
+    pipeline = Pipeline(steps=[ProjectionStep(camera=camera, executor=projection_executor)] + render_steps)
+
+    pushed_state = None
+
+
+    last_scene = None
+    profiler = FrameProfiler()
+    last_draw_end = time.perf_counter()
+    last_stats_update = 0.0
+    fps_since = time.perf_counter()
+
+
+    tk = Tk()
+    tk.config(cursor="none")
+    canvas = Canvas(tk, width=options.width, height=options.height)
+    canvas.pack()
+
+    if options.renderer == "raster":
+        renderer = PhotoRenderer(canvas, width=options.width, height=options.height)
+    else:
+        renderer = CanvasRenderer(canvas)
+
+    overlay_tag = "overlay"
+    fps_text = canvas.create_text(20, 10, tags=overlay_tag)
+    camera_text = canvas.create_text(145, 40, tags=overlay_tag, state=HIDDEN)
+    target_text = canvas.create_text(windowCenter.x + options.cross_hair_scale + 5,
+                                     windowCenter.y + options.cross_hair_scale, anchor=NW, tags=overlay_tag,
+                                     state=HIDDEN)
+    stats_text = canvas.create_text(20, 90, anchor=NW, font="TkFixedFont", tags=overlay_tag, state=HIDDEN)
+    canvas.create_line(windowCenter.x, windowCenter.y - options.cross_hair_scale,
+                       windowCenter.x, windowCenter.y + options.cross_hair_scale,
+                       width=2, tags=overlay_tag)
+    canvas.create_line(windowCenter.x - options.cross_hair_scale, windowCenter.y,
+                       windowCenter.x + options.cross_hair_scale, windowCenter.y,
+                       width=2, tags=overlay_tag)
+
+    input_state = InputState(center=windowCenter)
+    tk.bind(sequence="<KeyPress>", func=input_state.key_press)
+    tk.bind(sequence="<KeyRelease>", func=input_state.key_release)
+    tk.bind(sequence="<FocusOut>", func=input_state.focus_out)
+    tk.bind(sequence="<Motion>", func=input_state.motion)
+    tk.bind(sequence="i", func=toggle_info)
+    tk.bind(sequence="f", func=toggle_fps)
+    tk.bind(sequence="m", func=toggle_solid)
+    tk.bind(sequence="c", func=dump_frame_times)
+
+    scheduler = FrameScheduler(tk, tick_rate=options.tickRate, refresh_rate=options.refreshRate,
+                               update=apply_input, render=draw)
+
+    pipeline.start()
+    scheduler.start()
+    tk.mainloop()
+    scheduler.stop()
+    pipeline.stop()
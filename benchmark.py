@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from geometry.camera import Camera
+from geometry.mesh import Mesh, project_instances
+from geometry.quaternion import Quaternion
+from geometry.vector import Vector
+from rendering.canvas_renderer import CanvasRenderer
+from rendering.drawListStep import build_draw_list
+from rendering.rasterizer import Rasterizer
+from scene.entity import Entity
+from scene.scene import Scene
+from shape.cube import Cube
+from shape.plane import Plane
+
+SEED = 1234
+CUBE_COUNTS = (1, 10, 100)
+PLANE_LENGTHS = (4, 8, 16, 32, 64)
+MODELS = sorted(glob.glob("ressources/*.obj"))
+
+
+class StubCanvas:
+    # stands in for tkinter.Canvas without a display, counting the calls a frame makes
+    def __init__(self):
+        self.calls = 0
+        self.next_item = 0
+
+    def _create(self, *args, **kwargs) -> int:
+        self.calls += 1
+        self.next_item += 1
+        return self.next_item
+
+    create_line = create_text = create_polygon = create_image = _create
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+
+    coords = itemconfigure = delete = tag_raise = _call
+
+
+class Benchmark:
+    def __init__(self, repeat: int, min_time: float):
+        self.repeat = repeat
+        self.min_time = min_time
+        self.results: List[Dict] = []
+
+    def measure(self, name: str, params: Dict, func: Callable[[], object]):
+        func()  # warm up caches and lazy state
+
+        # calibrate the number of calls per sample to min_time
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.min_time or number >= 1 << 20:
+                break
+            number *= 2
+
+        samples = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number * 1e6)
+
+        result = {
+            "name": name,
+            "params": params,
+            "number": number,
+            "repeat": self.repeat,
+            "min_us": min(samples),
+            "median_us": statistics.median(samples),
+        }
+        self.results.append(result)
+        print("{:<28} {:<36} {:>12.2f} us".format(name, json.dumps(params), result["median_us"]), file=sys.stderr)
+
+
+def make_camera() -> Camera:
+    camera = Camera(position=Vector(z=-200), focal_length=500, viewport_offset=Vector(x=600, y=500))
+    camera.rotate(Vector(y=1), 10, True)
+    camera.rotate(Vector(x=1), 5)
+    return camera
+
+
+def cube_scene(count: int) -> Scene:
+    rng = random.Random(SEED)
+    scene = Scene()
+    for _ in range(count):
+        origin = Vector(x=rng.uniform(-100, 100), y=rng.uniform(-100, 100), z=rng.uniform(0, 200))
+        scene.scene_root.add_entity(Entity(geometry=Cube(origin=origin, cube_size=rng.uniform(5, 20))))
+    return scene
+
+
+def load_models() -> Dict[str, Mesh]:
+    models = {}
+    for path in MODELS:
+        mesh = Mesh.import_from(path, cache=False)
+        mesh.scale(20)
+        models[os.path.basename(path)] = mesh
+    return models
+
+
+def bench_transforms(bench: Benchmark, models: Dict[str, Mesh]):
+    rotation = Quaternion.axis_angle(Vector(x=1, y=1), 1)
+    # the number of calls depends on the machine, so transform copies and leave the shared models to later suites
+    meshes = {name: mesh.copy() for name, mesh in models.items()}
+    for length in PLANE_LENGTHS:
+        meshes["plane_{}".format(length)] = Plane(length=length, grid_size=5.0)
+
+    for name, mesh in meshes.items():
+        params = {"mesh": name, "vertices": len(mesh.positions)}
+        bench.measure("mesh.rotate", params, lambda: mesh.rotate(rotation))
+        bench.measure("mesh.scale", params, lambda: mesh.scale(1.0))
+
+
+def bench_projection(bench: Benchmark, models: Dict[str, Mesh]):
+    camera = make_camera()
+    meshes = dict(models)
+    for length in PLANE_LENGTHS:
+        meshes["plane_{}".format(length)] = Plane(length=length, grid_size=5.0)
+
+    for name, mesh in meshes.items():
+        params = {"mesh": name, "vertices": len(mesh.positions)}
+        bench.measure("mesh.project_to", params, lambda: mesh.project_to(camera))
+        bench.measure("camera.project_many", params, lambda: camera.project_many(mesh.positions, mesh.center))
+
+    rng = random.Random(SEED)
+    cube = Cube(cube_size=10)
+    for count in (100, 1000):
+        instances = [cube.instance(Vector(x=rng.uniform(-100, 100), y=rng.uniform(-100, 100), z=rng.uniform(0, 200)),
+                                   Quaternion.axis_angle(Vector(x=rng.random(), y=1), rng.uniform(0, 360)))
+                     for _ in range(count)]
+        bench.measure("project_instances", {"instances": count}, lambda: project_instances(instances, camera))
+
+    rng = np.random.default_rng(SEED)
+    points = [Vector(x=x, y=y, z=z) for x, y, z in rng.uniform(-50, 50, (1000, 3)).tolist()]
+    origin = Vector()
+
+    def project_points():
+        for point in points:
+            camera.project(point, origin)
+
+    bench.measure("camera.project", {"points": len(points)}, project_points)
+
+
+def bench_scene_copy(bench: Benchmark):
+    camera = make_camera()
+    for count in CUBE_COUNTS:
+        scene = cube_scene(count)
+        bench.measure("scene.copy", {"cubes": count}, scene.copy)
+        bench.measure("scene.snapshot", {"cubes": count}, lambda: scene.snapshot(camera))
+
+
+def bench_import(bench: Benchmark):
+    for path in MODELS:
+        params = {"model": os.path.basename(path)}
+        bench.measure("mesh.import_from", dict(params, cache=False), lambda: Mesh.import_from(path, cache=False))
+        bench.measure("mesh.import_from", dict(params, cache=True), lambda: Mesh.import_from(path, cache=True))
+
+
+def bench_quaternion(bench: Benchmark):
+    rng = random.Random(SEED)
+    a = Quaternion.axis_angle(Vector(x=rng.random(), y=rng.random(), z=rng.random()), rng.uniform(0, 360))
+    b = Quaternion.axis_angle(Vector(x=rng.random(), y=rng.random(), z=rng.random()), rng.uniform(0, 360))
+    v = Vector(x=rng.random(), y=rng.random(), z=rng.random())
+    bench.measure("quaternion.multiply", {}, lambda: a * b)
+    bench.measure("quaternion.rotate", {}, lambda: a.rotate(v))
+
+
+def bench_draw(bench: Benchmark, models: Dict[str, Mesh]):
+    camera = make_camera()
+    scenes = {"cubes_{}".format(count): cube_scene(count) for count in CUBE_COUNTS}
+    for name, mesh in models.items():
+        scene = Scene()
+        scene.scene_root.add_entity(Entity(geometry=mesh.copy(offset=Vector(z=100))))
+        scenes[name] = scene
+    for length in PLANE_LENGTHS:
+        scene = Scene()
+        scene.scene_root.add_entity(Entity(geometry=Plane(origin=Vector(x=-100, y=-100, z=50), length=length,
+                                                           grid_size=200.0 / length)))
+        scenes["plane_{}".format(length)] = scene
+
+    for name, scene in scenes.items():
+        for entity in scene.entities():
+            entity.geometry.project_to(camera)
+        draw_list = build_draw_list(scene)
+        canvas = StubCanvas()
+        renderer = CanvasRenderer(canvas)
+        renderer.render(draw_list)
+
+        bench.measure("mesh.draw", {"scene": name},
+                      lambda: [entity.geometry.draw(StubCanvas()) for entity in scene.entities()])
+        # the same keys would skip every mesh, so the static and moved passes forget them first
+        bench.measure("renderer.render_unchanged", {"scene": name}, lambda: renderer.render(draw_list))
+
+        def render_static():
+            for items in renderer.meshes.values():
+                items.key = None  # diffed against the canvas, finding nothing to move
+            renderer.render(draw_list)
+
+        bench.measure("renderer.render_static", {"scene": name}, render_static)
+
+        def render_moved():
+            for items in renderer.meshes.values():
+                items.key = None
+                items.coords.fill(np.nan)  # every visible segment gets a coords call
+            renderer.render(draw_list)
+
+        bench.measure("renderer.render_moved", {"scene": name}, render_moved)
+
+
+def bench_raster(bench: Benchmark, models: Dict[str, Mesh]):
+    camera = make_camera()
+    rasterizer = Rasterizer(width=1200, height=1000)  # the viewport of make_camera
+    meshes = {name: [mesh.copy(offset=Vector(z=100))] for name, mesh in models.items()}
+    for length in (2, 32):
+        # planes much larger than the screen, a few big triangles or many small ones covering every pixel
+        meshes["screen_plane_{}".format(length)] = [Plane(origin=Vector(x=-800, y=-800, z=-100), length=length,
+                                                          grid_size=1600.0 / length)]
+    for name, scene_meshes in meshes.items():
+        for mesh in scene_meshes:
+            mesh.project_to(camera)
+        bench.measure("rasterizer.draw_meshes", {"scene": name}, lambda: rasterizer.draw_meshes(scene_meshes))
+
+    # a single triangle filling the screen
+    screens = np.array([[[-100.0, -100.0], [2500.0, -100.0], [-100.0, 2100.0]]])
+    inverse_depths = np.full((1, 3), 0.01)
+    levels = np.array([128])
+
+    def draw_triangle():
+        rasterizer.clear()
+        rasterizer.draw_triangles(screens, inverse_depths, levels)
+
+    bench.measure("rasterizer.draw_triangles", {"triangle": "screen"}, draw_triangle)
+
+
+suites = {
+    "transform": lambda bench, models: bench_transforms(bench, models),
+    "projection": lambda bench, models: bench_projection(bench, models),
+    "copy": lambda bench, models: bench_scene_copy(bench),
+    "import": lambda bench, models: bench_import(bench),
+    "quaternion": lambda bench, models: bench_quaternion(bench),
+    "draw": lambda bench, models: bench_draw(bench, models),
+    "raster": lambda bench, models: bench_raster(bench, models),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the geometry and rendering hot paths")
+    parser.add_argument("--suite", action="append", choices=sorted(suites), help="default: every suite")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per sample")
+    parser.add_argument("--output", help="JSON file, default stdout")
+    args = parser.parse_args()
+
+    random.seed(SEED)
+    np.random.seed(SEED)
+
+    bench = Benchmark(repeat=args.repeat, min_time=args.min_time)
+    models = load_models()
+    for name in args.suite or suites:
+        suites[name](bench, models)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": SEED,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": bench.results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
-from tkinter import Canvas
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 
 from geometry.line import Line
-from geometry.vector import Vector
+from geometry.projection import Projection
+
+if TYPE_CHECKING:
+    from tkinter import Canvas
 
 
 class Triangle:
-    def __init__(self, a: Vector, b: Vector, c: Vector):
+    def __init__(self, a: Projection, b: Projection, c: Projection):
         self.a = a  # unused but who knows
         self.b = b  # unused but who knows
         self.c = c  # unused but who knows
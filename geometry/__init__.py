@@ -1,6 +1,19 @@
+from itertools import count
+
+
 class GeometryOptions:
     def __init__(self):
         self.line_thickness = 1
+        self.light_direction = (-0.5, 1.0, -0.75)  # towards the light, in world space
+        self.ambient_light = 0.25
+        self.lod_pixel_error = 1.0  # coarser levels of detail are used while their error stays below this on screen
+
+
+geometry_options = GeometryOptions()
+
+_versions = count(1)
 
 
-geometry_options = GeometryOptions()
\ No newline at end of file
+def next_version() -> int:
+    # versions are unique across every object, so (version, version) pairs never collide
+    return next(_versions)
@@ -1,5 +1,11 @@
-from math import cos, sin
+from __future__ import annotations
 
+from typing import Optional, Tuple
+
+import numpy as np
+
+from geometry import matrix, next_version
+from geometry.projection import Projection
 from geometry.quaternion import Quaternion
 from geometry.vector import Vector
 
@@ -8,61 +14,141 @@ class Camera:
     def __init__(self, position: Vector = Vector(), focal_length: float = 500, viewport_offset: Vector = Vector()):
         self.position = position.copy(label="camera")
         self.rotation = Quaternion.identity()
-        self.bearing = Vector(z=1)
-        self.bearing.projection = Vector(z=1)
+        self.bearing = Vector(z=1)  # in camera space
+        self.world_bearing = Vector(z=1)
         self.view_port = viewport_offset.copy(label="view_port")
         self.view_port.z = focal_length
-        self.C = Vector(x=cos(0), y=cos(0), z=cos(0))
-        self.S = Vector(x=sin(0), y=sin(0), z=sin(0))
+        self.near_plane = 1.0
+        self._view_projection_version = None
+        self.update_data()
+
+    def copy(self) -> Camera:
+        camera = Camera(position=self.position, focal_length=self.view_port.z, viewport_offset=self.view_port)
+        camera.rotation = self.rotation  # quaternions are replaced, never mutated
+        camera.near_plane = self.near_plane
+        camera.update_data()
+        camera.version = self.version
+        return camera
 
     def translate(self, v: Vector, global_movement: bool = False):
         if not global_movement:
-            v = self.rotation.rotate(v)
+            (ax, ay, az), (bx, by, bz), (cx, cy, cz) = self.rotation_matrix.tolist()
+            v = Vector(x=ax * v.x + ay * v.y + az * v.z,
+                       y=bx * v.x + by * v.y + bz * v.z,
+                       z=cx * v.x + cy * v.y + cz * v.z)
 
-        self.position.translate(v)
+        self.position.iadd(v)
+        self.version = next_version()
+
+    def move_view_port(self, v: Vector):
+        self.view_port.translate(v)
+        self.version = next_version()
 
     def rotate(self, axis: Vector, angle: float, global_rotation: bool = False):
         rot = Quaternion.axis_angle(axis=axis, angle=angle)
 
         if global_rotation:
-            self.rotation = rot * self.rotation  # rotate over current camera rotation
+            self.turn(global_rotation=rot)
         else:
-            self.rotation = self.rotation * rot  # rotate under current camera rotation
-
+            self.turn(local_rotation=rot)
+
+    def turn(self, global_rotation: Optional[Quaternion] = None, local_rotation: Optional[Quaternion] = None):
+        # both rotations at once, for a single update_data
+        if global_rotation is not None:
+            self.rotation = global_rotation * self.rotation  # rotate over current camera rotation
+        if local_rotation is not None:
+            self.rotation = self.rotation * local_rotation  # rotate under current camera rotation
         self.update_data()
 
     def update_data(self):
-        self.bearing.projection.move_to(self.rotation.rotate(self.bearing))
-        euler = self.rotation.euler_angles()
-        self.C = Vector(x=cos(euler.x), y=cos(euler.y), z=cos(euler.z))
-        self.S = Vector(x=sin(euler.x), y=sin(euler.y), z=sin(euler.z))
-
-    def project(self, point: Vector, mesh_position: Vector):
-        cx = self.C.x
-        cy = self.C.y
-        cz = self.C.z
-
-        sx = self.S.x
-        sy = self.S.y
-        sz = self.S.z
-
-        delta = point + mesh_position - self.position
-
-        dot = delta.dot(self.bearing.projection)
-        if dot <= 0:
-            point.visible = False
-            return
-
-        d_x = cy * (sz * delta.y + cz * delta.x) - sy * delta.z
-        d_y = sx * (cy * delta.z + sy * (sz * delta.y + cz * delta.x)) + cx * (cz * delta.y - sz * delta.x)
-        d_z = cx * (cy * delta.z + sy * (sz * delta.y + cz * delta.x)) - sx * (cz * delta.y - sz * delta.x)
-
-        x = (self.view_port.z / d_z) * d_x + self.view_port.x
-        y = (-(self.view_port.z / d_z) * d_y) + self.view_port.y # reverse y as the screen origin is top left
-
-        point.projection = Vector(point.label, x, y)
-        point.projection.d = dot
-        point.visible = True
+        self.version = next_version()
+        self.rotation = self.rotation.normalize()  # keeps repeated small rotations from drifting off unit length
+        self.rotation_matrix = matrix.from_quaternion(self.rotation)  # camera to world axes
+        self.view_rotation = self.rotation_matrix.T  # world to camera space
+        self.bearing_array = self.rotation_matrix[:, 2]
+        self.world_bearing.x, self.world_bearing.y, self.world_bearing.z = self.bearing_array.tolist()
+
+    def view_projection(self) -> np.ndarray:
+        # (3, 4) world to screen transform, rebuilt once per camera version
+        if self._view_projection_version != self.version:
+            self._view_projection = matrix.compose(matrix.perspective(self.view_port.z, self.view_port.x,
+                                                                      self.view_port.y),
+                                                   matrix.view(self.rotation_matrix, self.position))
+            self._view_projection_rows = self._view_projection.tolist()
+            self._view_projection_version = self.version
+        return self._view_projection
+
+    def project(self, point: Vector, mesh_position: Vector) -> Projection:
+        self.view_projection()
+        (ax, ay, az, aw), (bx, by, bz, bw), (cx, cy, cz, cw) = self._view_projection_rows
+        x = point.x + mesh_position.x
+        y = point.y + mesh_position.y
+        z = point.z + mesh_position.z
+
+        depth = cx * x + cy * y + cz * z + cw  # distance along the bearing
+        if depth <= 0:
+            return Projection(point.label, d=depth)
+
+        return Projection(point.label, (ax * x + ay * y + az * z + aw) / depth, (bx * x + by * y + bz * z + bw) / depth,
+                          depth, True)
+
+    def project_many(self, positions: np.ndarray, mesh_position: Vector,
+                     rotation: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        center = np.array([[mesh_position.x, mesh_position.y, mesh_position.z]])
+        screen, depth, visible = self.project_instances(positions, center, None if rotation is None else rotation[None])
+        return screen[0], depth[0], visible[0]
+
+    def project_instances(self, positions: np.ndarray, centers: np.ndarray,
+                          rotations: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # positions (N, 3) shared by I instances placed at centers (I, 3) with optional rotations (I, 3, 3);
+        # gives screen (I, N, 2), depth (I, N) and visible (I, N)
+        return matrix.project_instances(self.view_projection(), positions, centers, rotations)
+
+    def frustum_planes(self) -> np.ndarray:
+        # camera space planes (nx, ny, nz, d), a point p is inside when n.p + d >= 0 for all of them;
+        # the viewport offset is the window center so it also gives the half extents of the screen
+        tx = self.view_port.x / self.view_port.z
+        ty = self.view_port.y / self.view_port.z
+        planes = np.array([
+            [0.0, 0.0, 1.0, 0.0],  # near, through the camera like the depth > 0 visibility test
+            [-1.0, 0.0, tx, 0.0],  # right
+            [1.0, 0.0, tx, 0.0],  # left
+            [0.0, -1.0, ty, 0.0],  # top
+            [0.0, 1.0, ty, 0.0],  # bottom
+        ])
+        planes /= np.linalg.norm(planes[:, :3], axis=1)[:, np.newaxis]
+        return planes
+
+    def world_frustum_planes(self) -> np.ndarray:
+        # frustum_planes moved to world space, for testing many boxes without transforming them
+        planes = self.frustum_planes()
+        normals = planes[:, :3] @ self.view_rotation
+        position = np.array([self.position.x, self.position.y, self.position.z])
+        return np.hstack((normals, (planes[:, 3] - normals @ position)[:, np.newaxis]))
+
+    def sees(self, sphere_center: np.ndarray, radius: float, corners: np.ndarray) -> bool:
+        position = np.array([self.position.x, self.position.y, self.position.z])
+        planes = self.frustum_planes()
+
+        center = self.view_rotation @ (sphere_center - position)
+        distances = planes[:, :3] @ center + planes[:, 3]
+        if np.any(distances < -radius):
+            return False
+        if np.all(distances >= radius):
+            return True
+
+        # sphere straddles a plane, the box is outside only if all its corners are behind the same plane
+        points = (corners - position) @ self.view_rotation.T
+        distances = points @ planes[:, :3].T + planes[:, 3]
+        return not np.any(np.all(distances < 0, axis=0))
+
+    def ray(self, x: float, y: float) -> Tuple[np.ndarray, np.ndarray]:
+        # world space origin and unit direction of the line of sight through screen point x, y
+        focal_length = self.view_port.z
+        direction = self.view_rotation.T @ ((x - self.view_port.x) / focal_length,
+                                            -(y - self.view_port.y) / focal_length,
+                                            1.0)
+        return np.array([self.position.x, self.position.y, self.position.z]), direction / np.linalg.norm(direction)
 
     def __str__(self):
         euler_angles = self.rotation.euler_angles()
@@ -72,4 +158,4 @@ class Camera:
                "    rotation_euler={}\n" \
                "    bearing={}\n" \
                "    viewport offset={}".format(self.position, self.rotation, euler_angles.to_degree(),
-                                               self.bearing.projection, self.view_port)
+                                               self.world_bearing, self.view_port)
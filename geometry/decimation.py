@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+def cluster_vertices(positions: np.ndarray, faces: np.ndarray,
+                     cell: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    # merges every vertex of a grid cell into their mean, also giving the largest distance a vertex moved;
+    # faces left with fewer than 3 distinct corners disappear
+    keys = np.floor((positions - positions.min(axis=0)) / cell).astype(np.int64)
+    _, cluster, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+    sums = np.zeros((len(counts), 3))
+    np.add.at(sums, cluster, positions)
+    clustered = sums / counts[:, np.newaxis]
+    error = float(np.linalg.norm(positions - clustered[cluster], axis=1).max())  # at most the cell diagonal
+
+    faces = cluster[faces]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+    # faces that collapsed onto the same corners are kept once, in their original order and winding
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    faces = faces[np.sort(first)]
+
+    used, remap = np.unique(faces, return_inverse=True)
+    return clustered[used], remap.reshape(-1, 3), error
+
+
+def decimate(positions: np.ndarray, faces: np.ndarray, levels: int) -> List[Tuple[np.ndarray, np.ndarray, float]]:
+    # (positions, faces, error) from full detail down to at most levels coarser meshes;
+    # the error is the largest distance a vertex moved
+    chain = [(positions, faces, 0.0)]
+    if len(faces) == 0:
+        return chain
+
+    edges = np.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]))
+    # starting at the mean edge length, every level clusters with a 1.5 times larger grid
+    cell = float(np.linalg.norm(positions[edges[:, 0]] - positions[edges[:, 1]], axis=1).mean())
+    while len(chain) <= levels and cell > 0:
+        coarse_positions, coarse_faces, error = cluster_vertices(positions, faces, cell)
+        if len(coarse_faces) < 4:
+            break  # collapsed to nothing
+        if len(coarse_faces) <= 0.8 * len(chain[-1][1]):  # skip cells barely simpler than the previous level
+            chain.append((coarse_positions, coarse_faces, error))
+        cell *= 1.5
+    return chain
@@ -1,15 +1,19 @@
-from tkinter import Canvas
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 
 from geometry import geometry_options
-from geometry.vector import Vector
+from geometry.projection import Projection
+
+if TYPE_CHECKING:
+    from tkinter import Canvas
 
 
 class Line:
-    def __init__(self, a: Vector, b: Vector):
+    def __init__(self, a: Projection, b: Projection):
         self.a = a
         self.b = b
 
     def draw(self, canvas: Canvas):
         if self.a.visible & self.b.visible:
-            canvas.create_line(self.a.projection.x, self.a.projection.y, self.b.projection.x, self.b.projection.y,
-                               width=geometry_options.line_thickness)
+            canvas.create_line(self.a.x, self.a.y, self.b.x, self.b.y, width=geometry_options.line_thickness)
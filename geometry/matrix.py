@@ -1,12 +1,94 @@
 from __future__ import annotations
 
-from typing import List
+from typing import TYPE_CHECKING, Optional, Tuple
 
+import numpy as np
 
-class Matrix:
-    def __init__(self, data: List[List[float]]):
-        self.data = data
+if TYPE_CHECKING:
+    from geometry.quaternion import Quaternion
+    from geometry.vector import Vector
 
-    @staticmethod
-    def identity(size: int) -> Matrix:
-        return Matrix([[1 if x == y else 0 for x in range(size)] for y in range(size)])
+# transforms are plain numpy arrays: (3, 3) rotations, (4, 4) affine transforms and a (3, 4) projection
+# taking homogeneous camera space points to (x * w, y * w, w) screen coordinates
+
+
+def identity(size: int) -> np.ndarray:
+    return np.identity(size)
+
+
+def from_quaternion(q: Quaternion) -> np.ndarray:
+    # rotation matrix of a unit quaternion
+    w, x, y, z = q.w, q.axis.x, q.axis.y, q.axis.z
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ])
+
+
+def transform(rotation: Optional[np.ndarray] = None, position: Optional[Vector] = None) -> np.ndarray:
+    # model matrix, rotating first and then moving to position
+    matrix = np.identity(4)
+    if rotation is not None:
+        matrix[:3, :3] = rotation
+    if position is not None:
+        matrix[:3, 3] = (position.x, position.y, position.z)
+    return matrix
+
+
+def view(rotation: np.ndarray, position: Vector) -> np.ndarray:
+    # world to camera space for a camera at position looking along rotation's z axis
+    matrix = np.identity(4)
+    matrix[:3, :3] = rotation.T
+    matrix[:3, 3] = rotation.T @ (-position.x, -position.y, -position.z)
+    return matrix
+
+
+def perspective(focal_length: float, offset_x: float, offset_y: float) -> np.ndarray:
+    # screen y is reversed as the screen origin is top left
+    return np.array([
+        [focal_length, 0.0, offset_x, 0.0],
+        [0.0, -focal_length, offset_y, 0.0],
+        [0.0, 0.0, 1.0, 0.0],
+    ])
+
+
+def compose(*matrices: np.ndarray) -> np.ndarray:
+    # left to right like the written product, so compose(projection, view, model) gives the model-view-projection;
+    # stacks of matrices (..., 4, 4) broadcast
+    result = matrices[-1]
+    for matrix in reversed(matrices[:-1]):
+        result = matrix @ result
+    return result
+
+
+def apply(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    # points (N, 3) through a (3, 3) rotation or the affine part of (R, 4) matrices, stacks giving (..., N, R)
+    if matrix.shape[-1] == 3:
+        return points @ np.swapaxes(matrix, -1, -2)
+    return points @ np.swapaxes(matrix[..., :3], -1, -2) + matrix[..., np.newaxis, :, 3]
+
+
+def instances(centers: np.ndarray, rotations: Optional[np.ndarray] = None) -> np.ndarray:
+    # model matrices (I, 4, 4) for instances placed at centers (I, 3) with optional rotations (I, 3, 3)
+    models = np.tile(np.identity(4), (len(centers), 1, 1))
+    models[:, :3, 3] = centers
+    if rotations is not None:
+        models[:, :3, :3] = rotations
+    return models
+
+
+def project_instances(view_projection: np.ndarray, positions: np.ndarray, centers: np.ndarray,
+                      rotations: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # positions (N, 3) shared by every instance: screen (I, N, 2), depth (I, N) and visible (I, N);
+    # plain arrays in and out so it can run in a worker process
+    return project(compose(view_projection, instances(centers, rotations)), positions)
+
+
+def project(matrix: np.ndarray, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # points (N, 3) through model-view-projection matrices (..., 3, 4): screen (..., N, 2), depth and in front mask
+    clip = apply(matrix, points)
+    depth = clip[..., 2]
+    visible = depth > 0
+    screen = clip[..., :2] / np.where(visible, depth, 1.0)[..., np.newaxis]
+    return screen, depth, visible
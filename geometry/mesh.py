@@ -1,13 +1,28 @@
 from __future__ import annotations
 
-import re
-from tkinter import Canvas
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
+import numpy as np
+
+from geometry import geometry_options, matrix, next_version
 from geometry.Triangle import Triangle
 from geometry.camera import Camera
+from geometry.obj_loader import load_obj
+from geometry.projection import Projection
 from geometry.quaternion import Quaternion
+from geometry.shading import face_polygons
 from geometry.vector import Vector
 
+if TYPE_CHECKING:
+    from tkinter import Canvas
+
+
+def frozen(array: np.ndarray) -> np.ndarray:
+    # geometry buffers are shared between copies, so they are never written in place
+    array.setflags(write=False)
+    return array
+
 
 class Mesh:
     def __init__(self, *triangles: Vector):
@@ -15,103 +30,334 @@ class Mesh:
 
         self.rotation = Vector()
         self.center = Vector()
-        self.viewportPosition = Vector()
-        self.vertices = triangles
-        self.triangles = []
-        i = 0
-        while i < len(triangles):
-            self.triangles.append(Triangle(self.vertices[i], self.vertices[i + 1], self.vertices[i + 2]))
-            i += 3
+        self.center_projection = Projection()
+
+        # triangles share their Vector instances, so identity gives the unique vertices
+        index = {}
+        positions = []
+        labels = []
+        faces = []
+        for vertex in triangles:
+            key = id(vertex)
+            if key not in index:
+                index[key] = len(positions)
+                positions.append((vertex.x, vertex.y, vertex.z))
+                labels.append(vertex.label)
+            faces.append(index[key])
+
+        self.set_buffers(positions=np.array(positions, dtype=float).reshape(-1, 3),
+                         faces=np.array(faces, dtype=int).reshape(-1, 3),
+                         labels=labels)
+
+    def set_buffers(self, positions: np.ndarray, faces: np.ndarray, labels: Optional[List[str]] = None):
+        self.positions = frozen(positions)  # (N, 3) unique vertex positions, relative to center
+        self.faces = frozen(faces)  # (M, 3) indices into positions
+        self.labels = labels if labels is not None else [""] * len(positions)
+        edges, face_edges = Mesh.unique_edges(faces)
+        self.edges = frozen(edges)  # (E, 2) undirected edges, each shared edge once
+        self.face_edges = frozen(face_edges)  # (M, 3) indices into edges
+        self.double_sided = False  # open surfaces opt out of back face culling
+        self.update_bounds()
+
+        # levels of detail, full detail first; the buffers above are those of the level in use
+        self.lods: Tuple[Mesh, ...] = ()
+        self.lod_errors: Tuple[float, ...] = ()  # largest vertex displacement of each level
+        self.lod = 0
+
+        # projection buffers, filled by project_to
+        self.screen = np.zeros((len(positions), 2))
+        self.depth = np.zeros(len(positions))
+        self.visible = np.zeros(len(positions), dtype=bool)
+        self.near_plane = 1.0  # of the camera the projection belongs to, faces are clipped against it
+        self.culled = False
+        self.draw_segments = None  # (segments, drawn) override left by the culling step for this projection
+        self.projection_key = None  # (mesh, placement, camera) versions the projection buffers belong to
+        self.version = next_version()
+
+        # world transform of the scene node holding this mesh, applied on top of center during projection
+        self.world_matrix: Optional[np.ndarray] = None
+        self.world_version = 0
+        self.orientation: Optional[np.ndarray] = None  # per instance rotation around center, None is identity
+
+    def update_bounds(self):
+        # local bounds around the center, refreshed whenever positions are replaced
+        if len(self.positions) == 0:
+            self.aabb = np.zeros((2, 3))
+        else:
+            self.aabb = np.stack((self.positions.min(axis=0), self.positions.max(axis=0)))
+        self.sphere_center = self.aabb.mean(axis=0)
+        self.sphere_radius = float(np.linalg.norm(self.aabb[1] - self.sphere_center))
+        self.corners = np.array([[x, y, z] for x in self.aabb[:, 0] for y in self.aabb[:, 1] for z in self.aabb[:, 2]])
+
+    def place(self, world_matrix: Optional[np.ndarray], world_version: int):
+        self.world_matrix = world_matrix
+        self.world_version = world_version
+
+    def placement(self) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        # rotation (None when neither the instance nor its node rotate) and world position of the center
+        center = np.array([self.center.x, self.center.y, self.center.z])
+        if self.world_matrix is None:
+            return self.orientation, center
+        world_rotation = self.world_matrix[:3, :3]
+        rotation = world_rotation if self.orientation is None else world_rotation @ self.orientation
+        return rotation, world_rotation @ center + self.world_matrix[:3, 3]
+
+    def world_positions(self) -> np.ndarray:
+        rotation, center = self.placement()
+        if rotation is None:
+            return self.positions + center
+        return self.positions @ rotation.T + center
+
+    def world_bounds(self) -> Tuple[np.ndarray, float, np.ndarray]:
+        rotation, center = self.placement()
+        if rotation is None:
+            return self.sphere_center + center, self.sphere_radius, self.corners + center
+        return rotation @ self.sphere_center + center, self.sphere_radius, self.corners @ rotation.T + center
+
+    @staticmethod
+    def unique_edges(faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if len(faces) == 0:  # empty meshes built by copy
+            return np.empty((0, 2), dtype=int), np.empty((0, 3), dtype=int)
+        edges = np.stack((faces, faces[:, [1, 2, 0]]), axis=2).reshape(-1, 2)
+        edges.sort(axis=1)
+        edges, inverse = np.unique(edges, axis=0, return_inverse=True)
+        return edges, inverse.reshape(-1, 3)
+
+    @staticmethod
+    def from_buffers(positions: np.ndarray, faces: np.ndarray, labels: Optional[List[str]] = None) -> Mesh:
+        m = Mesh()
+        m.set_buffers(positions=positions, faces=faces, labels=labels)
+        return m
+
+    @property
+    def vertices(self) -> Tuple[Vector, ...]:
+        return tuple(Vector(self.labels[idx], x, y, z) for idx, (x, y, z) in enumerate(self.positions.tolist()))
+
+    @property
+    def projections(self) -> Tuple[Projection, ...]:
+        return tuple(Projection(self.labels[idx], x, y, d, visible)
+                     for idx, ((x, y), d, visible) in enumerate(zip(self.screen.tolist(), self.depth.tolist(),
+                                                                    self.visible.tolist())))
+
+    @property
+    def triangles(self) -> List[Triangle]:
+        projections = self.projections
+        return [Triangle(projections[a], projections[b], projections[c]) for a, b, c in self.faces.tolist()]
 
     def set_center(self, center: Vector):
         self.center = center
+        self.version = next_version()
+
+    def segments(self) -> Tuple[np.ndarray, np.ndarray]:
+        # screen coordinates (x1, y1, x2, y2) of every edge, and whether both ends are visible
+        if self.draw_segments is not None:
+            return self.draw_segments
+        a = self.edges[:, 0]
+        b = self.edges[:, 1]
+        return np.hstack((self.screen[a], self.screen[b])), self.visible[a] & self.visible[b]
 
-    def draw(self, canvas: Canvas, debug=False):
-        for triangle in self.triangles:
-            triangle.draw(canvas)
+    def draw(self, canvas: Canvas, debug=False, solid=False):
+        if self.culled:
+            return
+        if solid:
+            coords, colors = face_polygons([self])
+            for polygon, color in zip(coords.tolist(), colors):
+                canvas.create_polygon(*polygon, fill=color, outline="black", width=geometry_options.line_thickness)
+        else:
+            segments, drawn = self.segments()
+            for x1, y1, x2, y2 in segments[drawn].tolist():
+                canvas.create_line(x1, y1, x2, y2, width=geometry_options.line_thickness)
         if debug:
-            canvas.create_text(self.viewportPosition.projection.x, self.viewportPosition.projection.y,
-                               text="Center = {}\nRotation = {}".format(self.center, self.rotation))
-            for vertex in self.vertices:
-                vertex.draw(canvas)
+            self.draw_debug(canvas)
+
+    def draw_debug(self, canvas: Canvas, tags=()):
+        canvas.create_text(self.center_projection.x, self.center_projection.y,
+                           text="Center = {}\nRotation = {}".format(self.center, self.rotation), tags=tags)
+        for idx in np.flatnonzero(self.visible).tolist():
+            x, y = self.screen[idx].tolist()
+            canvas.create_text(x, y, text=self.labels[idx], tags=tags)
+            canvas.create_text(x, y + 10, text="{:.2}".format(float(self.depth[idx])), tags=tags)
 
     def translate(self, v: Vector):
+        if v.x == 0 and v.y == 0 and v.z == 0:
+            return
         self.center.translate(v)
+        self.version = next_version()
 
     def translate_projections(self, v: Vector):
-        seen = []
-        self.viewportPosition.projection.translate(v)
-        for vertex in self.vertices:
-            if vertex in seen:
-                continue
-            vertex.projection.translate(v)
-            seen.append(vertex)
+        self.center_projection = self.center_projection.copy().translate(v)  # shared with copies
+        self.screen = self.screen + (v.x, v.y)
 
     def rotate(self, rotation: Quaternion) -> Mesh:
-        seen = []
-        for vertex in self.vertices:
-            if vertex in seen:
-                continue
-            v = rotation.rotate(vertex)
-            vertex.move_to(v)
-            seen.append(vertex)
+        if self.lods:
+            # levels are shared with copies, so they are replaced as a whole
+            self.lods = tuple(level.copy().rotate(rotation) for level in self.lods)
+            self.use_lod(self.lod)
+        else:
+            self.positions = frozen(matrix.apply(rotation.to_matrix(), self.positions))
+            self.update_bounds()
+        self.version = next_version()
         return self
 
     def scale(self, scale_factor: float) -> Mesh:
-        seen = []
-        for vertex in self.vertices:
-            if vertex in seen:
-                continue
-            v = vertex * scale_factor
-            vertex.move_to(v)
-            seen.append(vertex)
+        if self.lods:
+            self.lods = tuple(level.copy().scale(scale_factor) for level in self.lods)
+            self.lod_errors = tuple(error * abs(scale_factor) for error in self.lod_errors)
+            self.use_lod(self.lod)
+        else:
+            self.positions = frozen(self.positions * scale_factor)
+            self.update_bounds()
+        self.version = next_version()
         return self
 
     def project_to(self, camera: Camera):
-        seen = []
-        for vertex in self.vertices:
-            if vertex in seen:
-                continue
-            camera.project(point=vertex, mesh_position=self.center)
-            seen.append(vertex)
+        if not self.cull_to(camera):
+            return
+
+        rotation, center = self.placement()
+        world_center = Vector(x=center[0], y=center[1], z=center[2])
+        self.screen, self.depth, self.visible = camera.project_many(positions=self.positions,
+                                                                    mesh_position=world_center, rotation=rotation)
+        self.center_projection = camera.project(point=Vector(), mesh_position=world_center)
+
+    def cull_to(self, camera: Camera) -> bool:
+        # resets the projection for camera, False when the mesh is outside of its frustum
+        sphere_center, radius, corners = self.world_bounds()
+        if not camera.sees(sphere_center, radius, corners):
+            self.set_culled(camera)
+            return False
+        self.select_lod(camera, sphere_center, radius)
+        self.near_plane = camera.near_plane
+        self.draw_segments = None
+        self.projection_key = self.projection_version(camera)
+        self.culled = False
+        return True
+
+    def set_lods(self, levels: List[Tuple[np.ndarray, np.ndarray, float]]):
+        # levels as loaded by load_obj, the first one being the current buffers
+        self.lods = (self.copy(),) + tuple(Mesh.from_buffers(positions=positions, faces=faces)
+                                           for positions, faces, _ in levels[1:])
+        self.lod_errors = tuple(error for _, _, error in levels)
+        self.lod = 0
+
+    def use_lod(self, level: int):
+        source = self.lods[level]
+        self.positions, self.faces, self.labels = source.positions, source.faces, source.labels
+        self.edges, self.face_edges = source.edges, source.face_edges
+        self.aabb, self.corners = source.aabb, source.corners
+        self.sphere_center, self.sphere_radius = source.sphere_center, source.sphere_radius
+        self.lod = level
+
+    def select_lod(self, camera: Camera, sphere_center: np.ndarray, radius: float):
+        # coarsest level whose error, seen from the closest point of the bounding sphere, stays under a pixel budget
+        if len(self.lods) < 2:
+            return
+        position = np.array([camera.position.x, camera.position.y, camera.position.z])
+        depth = float(camera.bearing_array @ (sphere_center - position)) - radius
+        level = 0
+        if depth > camera.near_plane:
+            pixels = camera.view_port.z / depth
+            while level + 1 < len(self.lod_errors) \
+                    and self.lod_errors[level + 1] * pixels <= geometry_options.lod_pixel_error:
+                level += 1
+        if level != self.lod:
+            self.use_lod(level)
+
+    def set_culled(self, camera: Camera):
+        self.draw_segments = None
+        self.projection_key = self.projection_version(camera)
+        self.culled = True
+        self.visible = np.zeros(len(self.positions), dtype=bool)
 
-        camera.project(point=self.viewportPosition, mesh_position=self.center)
+    def intersect(self, origin: np.ndarray, direction: np.ndarray) -> Optional[float]:
+        # distance along the ray to the nearest face hit from either side, Moller-Trumbore over all faces at once
+        corners = self.world_positions()[self.faces]
+        edge1 = corners[:, 1] - corners[:, 0]
+        edge2 = corners[:, 2] - corners[:, 0]
+        p = np.cross(direction, edge2)
+        det = np.einsum("ij,ij->i", edge1, p)
+        valid = np.abs(det) > 1e-12
+        inv_det = 1.0 / np.where(valid, det, 1.0)
+
+        t_vec = origin - corners[:, 0]
+        u = np.einsum("ij,ij->i", t_vec, p) * inv_det
+        q = np.cross(t_vec, edge1)
+        v = (q @ direction) * inv_det
+        t = np.einsum("ij,ij->i", edge2, q) * inv_det
+
+        hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)
+        if not np.any(hit):
+            return None
+        return float(t[hit].min())
+
+    def projection_version(self, camera: Camera) -> Tuple[int, int, int]:
+        return self.version, self.world_version, camera.version
 
     def copy(self, offset: Vector = Vector()) -> Mesh:
-        vertices = [p.copy() for p in self.vertices]
-        m = Mesh(*vertices)
+        # geometry and the last projection are shared, both are replaced rather than mutated
+        m = Mesh.__new__(Mesh)  # every field is shared or set below, nothing to build
+        m.rotation = Vector()
+        m.center_projection = self.center_projection
+        m.positions, m.faces, m.labels = self.positions, self.faces, self.labels
+        m.edges, m.face_edges, m.double_sided = self.edges, self.face_edges, self.double_sided
+        m.screen, m.depth, m.visible, m.culled = self.screen, self.depth, self.visible, self.culled
+        m.near_plane = self.near_plane
+        m.draw_segments, m.projection_key = self.draw_segments, self.projection_key
+        m.aabb, m.corners = self.aabb, self.corners
+        m.sphere_center, m.sphere_radius = self.sphere_center, self.sphere_radius
+        m.world_matrix, m.world_version = self.world_matrix, self.world_version
+        m.orientation = self.orientation
+        m.lods, m.lod_errors, m.lod = self.lods, self.lod_errors, self.lod
         m.set_center(self.center.copy())
+        m.version = self.version
         m.translate(offset)
         return m
 
+    def instance(self, position: Vector, rotation: Optional[Quaternion] = None) -> Mesh:
+        # shares every geometry buffer, only the placement is per instance
+        m = self.copy()
+        m.set_center(position.copy())
+        m.orientation = None if rotation is None else rotation.to_matrix()
+        return m
+
     @staticmethod
-    def import_from(file_path: str) -> Mesh:
-        f = open(file_path, "r")
-
-        vertex_regex = re.compile("v\\s(-?[.0-9]+)\\s(-?[.0-9]+)\\s(-?[.0-9]+)")
-        triangle_regex = re.compile("f\\s(\\d+)\\s(\\d+)\\s(\\d+)")
-
-        vertices = []
-        triangles = []
-        lines = f.readlines()
-        for line in lines:
-            line_type = line[0]
-            if line_type == "#":
-                continue  # line is comment
-            elif line_type == "o":
-                pass  # mesh name ignored
-            elif line_type == "v":
-                groups = vertex_regex.search(line).groups()
-                vertex = Vector(x=float(groups[0]), y=float(groups[1]), z=float(groups[2]))
-                vertices.append(vertex)
-            elif line_type == "s":
-                pass  # Smooth shading ignored
-            elif line_type == "f":
-                groups = triangle_regex.search(line).groups()
-                triangles.append(vertices[int(groups[0])-1])
-                triangles.append(vertices[int(groups[1])-1])
-                triangles.append(vertices[int(groups[2])-1])
-            else:
-                print("ignored unknown format line {}".format(line))
-
-        return Mesh(*triangles)
+    def import_from(file_path: str, cache: bool = True) -> Mesh:
+        levels = load_obj(file_path, cache=cache)
+        positions, faces, _ = levels[0]
+        mesh = Mesh.from_buffers(positions=positions, faces=faces)
+        if len(levels) > 1:
+            mesh.set_lods(levels)
+        return mesh
+
+
+def project_instances(meshes: List[Mesh], camera: Camera, executor: Optional[Executor] = None) -> List[Mesh]:
+    # instances of the same geometry go through the camera in a single (instances x vertices) batch;
+    # grouped after culling, which may switch their level of detail. With an executor each batch is a task
+    # taking and returning plain arrays, the meshes themselves never leave this thread
+    groups = {}
+    for mesh in meshes:
+        if mesh.cull_to(camera):
+            groups.setdefault(id(mesh.positions), []).append(mesh)
+
+    batches = []
+    for seen in groups.values():
+        placements = [mesh.placement() for mesh in seen]
+        centers = np.array([center for _, center in placements])
+        rotations = None
+        if any(rotation is not None for rotation, _ in placements):
+            rotations = np.array([np.identity(3) if rotation is None else rotation for rotation, _ in placements])
+        batches.append((seen[0].positions, centers, rotations))
+
+    if executor is None:
+        projected = [camera.project_instances(*batch) for batch in batches]
+    else:
+        view_projection = camera.view_projection()
+        projected = executor.map(matrix.project_instances, [view_projection] * len(batches),
+                                 *zip(*batches))
+
+    for seen, (_, centers, _), (screen, depth, visible) in zip(groups.values(), batches, projected):
+        for idx, mesh in enumerate(seen):
+            mesh.screen, mesh.depth, mesh.visible = screen[idx], depth[idx], visible[idx]
+            x, y, z = centers[idx].tolist()
+            mesh.center_projection = camera.project(point=Vector(), mesh_position=Vector(x=x, y=y, z=z))
+    return meshes
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from geometry.decimation import decimate
+
+CACHE_VERSION = 3
+CACHE_SUFFIX = ".npz"
+LOD_LEVELS = 3
+
+Level = Tuple[np.ndarray, np.ndarray, float]  # positions, faces and geometric error of one level of detail
+
+ignored_types = {"#", "o", "g", "s", "vn", "vt", "vp", "l", "mtllib", "usemtl"}
+
+
+def parse_obj(lines: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    coordinates = []
+    faces = []
+    vertex_count = 0
+    unknown_types = set()
+
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        line_type = parts[0]
+        if line_type == "v":
+            coordinates.extend(parts[1:4])  # optional w component ignored
+            vertex_count += 1
+        elif line_type == "f":
+            # "a", "a/b", "a//c" or "a/b/c"; negative indices count back from the last vertex
+            polygon = []
+            for corner in parts[1:]:
+                idx = int(corner.split("/", 1)[0])
+                polygon.append(idx - 1 if idx > 0 else vertex_count + idx)
+            first = polygon[0]
+            for i in range(1, len(polygon) - 1):  # fan triangulation of quads and n-gons
+                faces.append((first, polygon[i], polygon[i + 1]))
+        elif line_type in ignored_types or line_type.startswith("#"):
+            continue
+        elif line_type not in unknown_types:
+            unknown_types.add(line_type)
+            print("ignored unknown format line {}".format(line.rstrip()))
+
+    positions = np.array(coordinates, dtype=float).reshape(-1, 3)
+    return positions, np.array(faces, dtype=int).reshape(-1, 3)
+
+
+def cache_path(file_path: str) -> str:
+    return file_path + CACHE_SUFFIX
+
+
+def file_digest(file_path: str) -> str:
+    sha = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def read_cache(file_path: str, lod_levels: int) -> Optional[List[Level]]:
+    path = cache_path(file_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as cached:
+            if int(cached["version"]) != CACHE_VERSION or int(cached["lod_levels"]) != lod_levels:
+                return None
+            # a touched but unchanged source still hits the cache through its hash
+            if float(cached["mtime"]) != os.path.getmtime(file_path) \
+                    and str(cached["digest"]) != file_digest(file_path):
+                return None
+            errors = cached["errors"].tolist()
+            return [(cached["positions_{}".format(level)], cached["faces_{}".format(level)], error)
+                    for level, error in enumerate(errors)]
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        return None  # unreadable or truncated, parsed again and rewritten
+
+
+def write_cache(file_path: str, levels: List[Level], lod_levels: int):
+    arrays = {}
+    for level, (positions, faces, _) in enumerate(levels):
+        arrays["positions_{}".format(level)] = positions
+        arrays["faces_{}".format(level)] = faces
+    path = cache_path(file_path)
+    try:
+        # written next to the sidecar and swapped in whole, an interrupted write never leaves a partial archive
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=CACHE_SUFFIX + ".tmp")
+    except OSError:
+        return  # read-only location, parse again next time
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, version=CACHE_VERSION, mtime=os.path.getmtime(file_path), digest=file_digest(file_path),
+                     lod_levels=lod_levels, errors=np.array([error for _, _, error in levels]), **arrays)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def load_obj(file_path: str, cache: bool = True, lod_levels: int = LOD_LEVELS) -> List[Level]:
+    # full detail first, then up to lod_levels decimated levels
+    if cache:
+        cached = read_cache(file_path, lod_levels)
+        if cached is not None:
+            return cached
+
+    with open(file_path, "r") as f:
+        positions, faces = parse_obj(f)
+    levels = decimate(positions, faces, lod_levels)
+
+    if cache:
+        write_cache(file_path, levels, lod_levels)
+    return levels
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from geometry.vector import Vector
+
+if TYPE_CHECKING:
+    from tkinter import Canvas
+
+
+class Projection:
+    # screen position of a point with its depth along the camera bearing, as given by Camera.project
+    __slots__ = ("label", "x", "y", "d", "visible")
+
+    def __init__(self, label="", x: float = 0.0, y: float = 0.0, d: float = 0.0, visible: bool = False):
+        self.label = label
+        self.x = x
+        self.y = y
+        self.d = d
+        self.visible = visible
+
+    def copy(self) -> Projection:
+        return Projection(self.label, self.x, self.y, self.d, self.visible)
+
+    def translate(self, v: Vector) -> Projection:
+        self.x += v.x
+        self.y += v.y
+        return self
+
+    def draw(self, canvas: Canvas):
+        canvas.create_text(self.x, self.y, text=self.label)
+        canvas.create_text(self.x, self.y + 10, text="{:.2}".format(float(self.d)))
+
+    def __str__(self) -> str:
+        return "({:.2f}, {:.2f}) d={:.2f}".format(self.x, self.y, self.d)
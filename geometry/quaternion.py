@@ -1,7 +1,10 @@
 from __future__ import annotations
 
-from math import radians, sin, cos, sqrt, atan2, asin, pi, fabs, copysign
+from math import radians, sin, cos, sqrt, atan2, asin, acos, pi, fabs, copysign
 
+import numpy as np
+
+from geometry import matrix
 from geometry.vector import Vector
 
 
@@ -11,10 +14,21 @@ class Quaternion:
         self.axis = axis
 
     def rotate(self, v: Vector) -> Vector:
-        q = self
-        p = Quaternion(0, v)
-        r = q * p * q.conjugate()
-        return r.axis
+        # q * v * q.conjugate() expanded to v + 2w(u x v) + 2u x (u x v), without the intermediate quaternions
+        w, ux, uy, uz = self.w, self.axis.x, self.axis.y, self.axis.z
+        tx = 2 * (uy * v.z - uz * v.y)
+        ty = 2 * (uz * v.x - ux * v.z)
+        tz = 2 * (ux * v.y - uy * v.x)
+        return Vector(x=v.x + w * tx + uy * tz - uz * ty,
+                      y=v.y + w * ty + uz * tx - ux * tz,
+                      z=v.z + w * tz + ux * ty - uy * tx)
+
+    def to_matrix(self) -> np.ndarray:
+        return matrix.from_quaternion(self)
+
+    def normalize(self) -> Quaternion:
+        length = self.det()
+        return Quaternion(w=self.w / length, axis=self.axis / length)
 
     def det(self) -> float:
         sq_axis = self.axis ** 2
@@ -56,6 +70,22 @@ class Quaternion:
 
         return Quaternion(w, vs)
 
+    @staticmethod
+    def slerp(a: Quaternion, b: Quaternion, t: float) -> Quaternion:
+        # constant angular speed from a at t=0 to b at t=1, along the shorter arc
+        dot = a.w * b.w + a.axis.x * b.axis.x + a.axis.y * b.axis.y + a.axis.z * b.axis.z
+        if dot < 0:
+            b = Quaternion(w=-b.w, axis=-b.axis)
+            dot = -dot
+        if dot > 0.9995:
+            # nearly parallel, a normalized lerp is accurate and avoids dividing by sin(~0)
+            ka, kb = 1 - t, t
+        else:
+            theta = acos(dot)
+            ka = sin((1 - t) * theta) / sin(theta)
+            kb = sin(t * theta) / sin(theta)
+        return Quaternion(w=ka * a.w + kb * b.w, axis=a.axis * ka + b.axis * kb).normalize()
+
     @staticmethod
     def identity() -> Quaternion:
         return Quaternion(1, Vector())
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, List, Tuple
+
+import numpy as np
+
+from geometry import geometry_options
+
+if TYPE_CHECKING:
+    from geometry.mesh import Mesh
+
+palette = np.array(["#{0:02x}{0:02x}{0:02x}".format(level) for level in range(256)])
+
+
+def shaded_faces(meshes: Iterable[Mesh]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # screen triangles (K, 3, 2), their vertex depths (K, 3) and gray levels (K,) for every visible face
+    screens = []
+    depths = []
+    normals = []
+    for mesh in meshes:
+        if mesh.culled or len(mesh.faces) == 0:
+            continue
+        screen, depth, source = clip_faces(mesh)
+
+        # counter-clockwise faces seen from outside have a positive area once y is flipped on screen
+        area = (screen[:, 1, 0] - screen[:, 0, 0]) * (screen[:, 2, 1] - screen[:, 0, 1]) \
+            - (screen[:, 1, 1] - screen[:, 0, 1]) * (screen[:, 2, 0] - screen[:, 0, 0])
+        corners = mesh.positions[mesh.faces[source]]
+        normal = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        rotation, _ = mesh.placement()
+        if rotation is not None:
+            normal = normal @ rotation.T  # light is in world space
+        if mesh.double_sided:
+            normal[area < 0] *= -1
+        else:
+            keep = area > 0
+            screen, depth, normal = screen[keep], depth[keep], normal[keep]
+
+        screens.append(screen)
+        depths.append(depth)
+        normals.append(normal)
+
+    if not screens:
+        return np.empty((0, 3, 2)), np.empty((0, 3)), np.empty(0, dtype=int)
+
+    normals = np.concatenate(normals)
+    light = np.array(geometry_options.light_direction, dtype=float)
+    light /= np.linalg.norm(light)
+    lengths = np.linalg.norm(normals, axis=1)
+    lambert = np.clip(normals @ light / np.where(lengths > 0, lengths, 1.0), 0.0, 1.0)
+    ambient = geometry_options.ambient_light
+    levels = ((ambient + (1 - ambient) * lambert) * 255).astype(int)
+
+    return np.concatenate(screens), np.concatenate(depths), levels
+
+
+def clip_faces(mesh: Mesh) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # screen triangles (K, 3, 2) and vertex depths (K, 3) of the faces cut at the near plane, with the face each
+    # came from; a face with one corner behind it becomes two triangles, with two corners behind it one smaller one
+    faces = mesh.faces
+    near = mesh.near_plane
+    inside = mesh.depth[faces] >= near
+    count = inside.sum(axis=1)
+
+    whole = np.flatnonzero(count == 3)
+    screens = [mesh.screen[faces[whole]]]
+    depths = [mesh.depth[faces[whole]]]
+    sources = [whole]
+
+    clipped = np.flatnonzero((count == 1) | (count == 2))
+    if len(clipped) > 0:
+        # clip space (x * w, y * w, w) is linear along an edge; projection leaves x, y undivided behind the camera
+        depth = mesh.depth
+        clip = np.hstack((mesh.screen * np.where(mesh.visible, depth, 1.0)[:, np.newaxis], depth[:, np.newaxis]))
+
+        # rotate the corners so the odd one out comes first, keeping the winding
+        single = count[clipped] == 1
+        first = np.where(single, inside[clipped].argmax(axis=1), inside[clipped].argmin(axis=1))
+        corners = faces[clipped[:, np.newaxis], (first[:, np.newaxis] + np.arange(3)) % 3]
+        a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+
+        def cut(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+            t = (near - depth[start]) / (depth[end] - depth[start])
+            return clip[start] + t[:, np.newaxis] * (clip[end] - clip[start])
+
+        ab = cut(a, b)
+        ca = cut(a, c)
+
+        def triangles(*points: np.ndarray) -> None:
+            stacked = np.stack(points, axis=1)
+            screens.append(stacked[:, :, :2] / stacked[:, :, 2:])
+            depths.append(stacked[:, :, 2])
+
+        # a in front: the tip a, ab, ca remains
+        triangles(clip[a[single]], ab[single], ca[single])
+        sources.append(clipped[single])
+        # a behind: the quad ab, b, c, ca is split in two
+        quad = ~single
+        triangles(ab[quad], clip[b[quad]], clip[c[quad]])
+        triangles(ab[quad], clip[c[quad]], ca[quad])
+        sources += [clipped[quad], clipped[quad]]
+
+    return np.concatenate(screens), np.concatenate(depths), np.concatenate(sources)
+
+
+def face_polygons(meshes: Iterable[Mesh]) -> Tuple[np.ndarray, List[str]]:
+    # screen polygons (x1, y1, x2, y2, x3, y3) of every visible face of all meshes, sorted back to front
+    screens, depths, levels = shaded_faces(meshes)
+    order = np.argsort(-depths.mean(axis=1), kind="stable")
+    return screens[order].reshape(-1, 6), palette[levels[order]].tolist()
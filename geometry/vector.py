@@ -1,19 +1,17 @@
 from __future__ import annotations
 
 from math import degrees, sqrt
-from tkinter import Canvas
 from typing import Optional
 
 
 class Vector:
+    __slots__ = ("label", "x", "y", "z")
+
     def __init__(self, label="", x: float = 0.0, y: float = 0.0, z: float = 0.0):
         self.label = label
         self.x = x
         self.y = y
         self.z = z
-        self.d = 0
-        self.projection = self
-        self.visible = False
 
     def copy(self, label: Optional[str] = None) -> Vector:
         return Vector(label=self.label if label is None else label, x=self.x, y=self.y, z=self.z)
@@ -24,15 +22,35 @@ class Vector:
         self.z += v.z
         return self
 
-    def draw(self, canvas: Canvas):
-        canvas.create_text(self.projection.x, self.projection.y, text=self.label)
-        canvas.create_text(self.projection.x, self.projection.y + 10, text="{:.2}".format(float(self.projection.d)))
+    # in place variants of the operators below, for loops that would otherwise allocate a Vector per step
+
+    def iadd(self, v: Vector) -> Vector:
+        return self.translate(v)
+
+    def isub(self, v: Vector) -> Vector:
+        self.x -= v.x
+        self.y -= v.y
+        self.z -= v.z
+        return self
+
+    def imul(self, mul: float) -> Vector:
+        self.x *= mul
+        self.y *= mul
+        self.z *= mul
+        return self
+
+    def fma(self, v: Vector, mul: float) -> Vector:
+        # self += v * mul
+        self.x += v.x * mul
+        self.y += v.y * mul
+        self.z += v.z * mul
+        return self
 
     def dot(self, other: Vector) -> float:
         return self.x * other.x + self.y * other.y + self.z * other.z
 
     def magnitude(self) -> float:
-        return sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+        return sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
 
     def normalize(self) -> Vector:
         mag = self.magnitude()
@@ -57,6 +75,9 @@ class Vector:
             z=self.z + other.z,
         )
 
+    def __iadd__(self, other: Vector) -> Vector:
+        return self.translate(other)
+
     def __pow__(self, power, modulo=None) -> Vector:
         return Vector(x=self.x ** power, y=self.y ** power, z=self.z ** power)
 
@@ -68,12 +89,18 @@ class Vector:
             z=self.z - other.z,
         )
 
+    def __isub__(self, other: Vector) -> Vector:
+        return self.isub(other)
+
     def __neg__(self) -> Vector:
-        return Vector() - self
+        return Vector(x=-self.x, y=-self.y, z=-self.z)
 
     def __mul__(self, mul: float):
         return Vector(x=self.x * mul, y=self.y * mul, z=self.z * mul)
 
+    def __imul__(self, mul: float) -> Vector:
+        return self.imul(mul)
+
     def __truediv__(self, div: float) -> Vector:
         return Vector(x=self.x / div, y=self.y / div, z=self.z / div)
 
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import time
+
+from geometry.mesh import Mesh
+from geometry.vector import Vector
+from rendering.offscreen import frame_formats, render_frames, turntable
+from scene.entity import Entity
+from scene.scene import Scene
+
+
+def parse_size(size: str):
+    width, height = size.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render turntables of OBJ models without a display")
+    parser.add_argument("models", nargs="*", default=sorted(glob.glob("ressources/*.obj")))
+    parser.add_argument("--frames", type=int, default=36)
+    parser.add_argument("--size", type=parse_size, default=(600, 500), help="WIDTHxHEIGHT")
+    parser.add_argument("--scale", type=float, default=20.0)
+    parser.add_argument("--distance", type=float, default=80.0)
+    parser.add_argument("--focal-length", type=float, default=500.0)
+    parser.add_argument("--output", default="frames")
+    parser.add_argument("--format", choices=frame_formats, default="png")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 renders in this process")
+    args = parser.parse_args()
+
+    width, height = args.size
+    for model in args.models:
+        mesh = Mesh.import_from(model)
+        mesh.scale(args.scale)
+        mesh.translate(Vector(x=-mesh.sphere_center[0], y=-mesh.sphere_center[1], z=-mesh.sphere_center[2]))
+
+        scene = Scene()
+        scene.scene_root.add_entity(Entity(geometry=mesh))
+        cameras = turntable(target=Vector(), distance=args.distance, frames=args.frames,
+                            focal_length=args.focal_length, viewport_offset=Vector(x=width / 2, y=height / 2))
+
+        output = os.path.join(args.output, os.path.splitext(os.path.basename(model))[0])
+        start = time.time()
+        paths = render_frames(scene, cameras, width, height, output, frame_format=args.format, workers=args.workers)
+        print("{}: {} frames in {:.2f}s -> {}".format(model, len(paths), time.time() - start, output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from tkinter import Event
+from typing import Dict, Optional, Set, Tuple
+
+from geometry.vector import Vector
+
+
+class InputState:
+    # collects Tk key and pointer events between two simulation ticks, which then read them once;
+    # the pointer is warped back to center after every read, so its offset from center is the summed motion
+    def __init__(self, center: Vector):
+        self.center = center
+        self.held: Set[str] = set()
+        self.pointer: Optional[Tuple[float, float]] = None
+        self.warp_pending = False
+
+    def key_press(self, event: Event):
+        self.held.add(event.keysym.lower())  # shift changes the keysym of letters
+
+    def key_release(self, event: Event):
+        self.held.discard(event.keysym.lower())
+
+    def focus_out(self, _: Event):
+        self.held.clear()  # releases happening outside the window are never seen
+
+    def motion(self, event: Event):
+        if self.warp_pending:
+            # events still queued from before the warp would count the same motion twice
+            if event.x == self.center.x and event.y == self.center.y:
+                self.warp_pending = False
+            return
+        self.pointer = (event.x, event.y)
+
+    def direction(self, bindings: Dict[str, Vector]) -> Vector:
+        # sum of the vectors bound to the held keys
+        direction = Vector()
+        for key in self.held:
+            vector = bindings.get(key)
+            if vector is not None:
+                direction.iadd(vector)
+        return direction
+
+    def take_pointer_offset(self) -> Tuple[float, float]:
+        # motion since the last call, the caller warps the pointer back to center when it is not zero
+        self.warp_pending = False
+        if self.pointer is None:
+            return 0.0, 0.0
+        x, y = self.pointer
+        self.pointer = None
+        offset = (x - self.center.x, y - self.center.y)
+        if offset != (0, 0):
+            self.warp_pending = True
+        return offset
@@ -9,6 +9,16 @@ class Options:
         self.originOffset = 1000
         self.cross_hair_scale = 10
         self.global_movement = False
+        self.move_speed = 45.0  # units per second while a movement key is held
+        self.turn_speed = 45.0  # degrees per second while a view key is held
+        self.zoom_speed = 45.0  # focal length change per second while page up or down is held
+        self.mouse_sensitivity = 0.15  # degrees per pixel of pointer motion
+        self.spin = False  # animate the demo cube and cylinder
+        self.solid = False  # filled, depth sorted faces instead of wireframe
+        self.renderer = "canvas"  # "canvas" items or "raster" for the z-buffer rasterizer
+        self.frame_times_csv = "frame_times.csv"  # written when pressing c
+        self.projection_workers = 0  # meshes projected concurrently, 0 projects on the pipeline thread
+        self.projection_processes = False  # use processes instead of threads for projection workers
 
     @property
     def tick_delay(self):
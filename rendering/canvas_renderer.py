@@ -0,0 +1,121 @@
+from tkinter import Canvas, HIDDEN, NORMAL
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from geometry import geometry_options
+from rendering.drawListStep import DrawEntry, PolygonList
+
+
+class MeshItems:
+    def __init__(self, items: List[int]):
+        self.items = items
+        self.shown = np.zeros(len(items), dtype=bool)
+        self.coords = np.full((len(items), 4), np.nan)
+        self.key = None
+
+
+class CanvasRenderer:
+    debug_tag = "debug"
+
+    def __init__(self, canvas: Canvas):
+        self.canvas = canvas
+        self.meshes: Dict[int, MeshItems] = {}
+
+        # polygons keep their stacking order, the k-th item always shows the k-th farthest face
+        self.polygons: List[int] = []
+        self.polygon_coords = np.empty((0, 6))
+        self.polygon_colors: List[str] = []
+        self.polygons_shown = 0
+
+    def render(self, draw_list: Iterable[DrawEntry], debug: bool = False):
+        self.canvas.delete(self.debug_tag)
+
+        seen = set()
+        for entry in draw_list:
+            seen.add(entry.uid)
+            self.render_mesh(entry)
+            if debug and not entry.culled:
+                entry.mesh.draw_debug(self.canvas, tags=self.debug_tag)
+
+        for uid in [uid for uid in self.meshes if uid not in seen]:
+            self.release(uid)
+
+    def render_polygons(self, polygons: Optional[PolygonList]):
+        canvas = self.canvas
+        count = 0 if polygons is None else len(polygons.coords)
+
+        missing = count - len(self.polygons)
+        if missing > 0:
+            self.polygons.extend(canvas.create_polygon(0, 0, 0, 0, 0, 0, outline="black", state=HIDDEN,
+                                                       width=geometry_options.line_thickness)
+                                 for _ in range(missing))
+            self.polygon_coords = np.vstack((self.polygon_coords, np.full((missing, 6), np.nan)))
+            self.polygon_colors.extend([""] * missing)
+
+        if count > 0:
+            moved = np.any(polygons.coords != self.polygon_coords[:count], axis=1)
+            for idx in np.flatnonzero(moved).tolist():
+                canvas.coords(self.polygons[idx], *polygons.coords[idx].tolist())
+            self.polygon_coords[:count] = polygons.coords
+
+            for idx, color in enumerate(polygons.colors):
+                if color != self.polygon_colors[idx] or idx >= self.polygons_shown:
+                    canvas.itemconfigure(self.polygons[idx], fill=color, state=NORMAL)
+                    self.polygon_colors[idx] = color
+
+        for idx in range(count, self.polygons_shown):
+            canvas.itemconfigure(self.polygons[idx], state=HIDDEN)
+        self.polygons_shown = count
+
+    def render_mesh(self, entry: DrawEntry):
+        mesh_items = self.meshes.get(entry.uid)
+        if mesh_items is not None and entry.key[0] is not None and mesh_items.key == entry.key:
+            return
+        if entry.culled:
+            if mesh_items is not None:
+                self.hide(mesh_items)
+            return
+
+        segments, drawn = entry.segments, entry.drawn
+        if mesh_items is None or len(mesh_items.items) < len(segments):
+            if mesh_items is not None:
+                self.release(entry.uid)
+            mesh_items = self.allocate(entry.uid, max(entry.item_count, len(segments)))
+        spare = len(mesh_items.items) - len(segments)
+        if spare > 0:
+            # a coarser level of detail, the items past its edges are hidden
+            segments = np.vstack((segments, np.full((spare, 4), np.nan)))
+            drawn = np.concatenate((drawn, np.zeros(spare, dtype=bool)))
+
+        canvas = self.canvas
+        items = mesh_items.items
+
+        moved = drawn & np.any(segments != mesh_items.coords, axis=1)
+        for idx in np.flatnonzero(moved).tolist():
+            canvas.coords(items[idx], *segments[idx].tolist())
+        mesh_items.coords[moved] = segments[moved]
+
+        for idx in np.flatnonzero(drawn & ~mesh_items.shown).tolist():
+            canvas.itemconfigure(items[idx], state=NORMAL)
+        for idx in np.flatnonzero(~drawn & mesh_items.shown).tolist():
+            canvas.itemconfigure(items[idx], state=HIDDEN)
+        mesh_items.shown = drawn
+        mesh_items.key = entry.key
+
+    def hide(self, mesh_items: MeshItems):
+        for idx in np.flatnonzero(mesh_items.shown).tolist():
+            self.canvas.itemconfigure(mesh_items.items[idx], state=HIDDEN)
+        mesh_items.shown = np.zeros(len(mesh_items.items), dtype=bool)
+        mesh_items.key = None
+
+    def allocate(self, uid: int, count: int) -> MeshItems:
+        items = [self.canvas.create_line(0, 0, 0, 0, width=geometry_options.line_thickness, state=HIDDEN)
+                 for _ in range(count)]
+        self.meshes[uid] = MeshItems(items)
+        return self.meshes[uid]
+
+    def release(self, uid: int):
+        mesh_items = self.meshes.pop(uid)
+        for item in mesh_items.items:
+            self.canvas.delete(item)
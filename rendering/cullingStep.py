@@ -0,0 +1,68 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from geometry.camera import Camera
+from geometry.mesh import Mesh
+from geometry.vector import Vector
+from rendering.pipeline_step import PipelineStep
+from scene.scene import Scene
+
+
+class CullingStep(PipelineStep):
+    def __init__(self, camera: Camera):
+        super().__init__()
+        self.camera = camera
+        self.culled: Dict[int, Tuple[Tuple[int, int, int], Tuple[np.ndarray, np.ndarray]]] = {}  # uid -> key, segments
+
+    def process_scene(self, scene: Scene):
+        camera = scene.camera or self.camera
+        culled = {}
+        for entity in scene.entities():
+            mesh = entity.geometry
+            if mesh.culled:
+                continue
+            previous = self.culled.get(entity.uid)
+            if previous is not None and previous[0] == mesh.projection_key:
+                mesh.draw_segments = previous[1]
+            else:
+                self.process_mesh(mesh, camera)
+            culled[entity.uid] = (mesh.projection_key, mesh.draw_segments)
+        self.culled = culled
+
+    def process_mesh(self, mesh: Mesh, camera: Camera):
+        world = mesh.world_positions()
+        a = mesh.edges[:, 0]
+        b = mesh.edges[:, 1]
+
+        if mesh.double_sided:
+            drawn = np.ones(len(mesh.edges), dtype=bool)
+        else:
+            # faces wind counter-clockwise seen from outside, keep the edges of faces turned to the camera
+            corners = world[mesh.faces]
+            normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+            to_camera = (camera.position.x, camera.position.y, camera.position.z) - corners[:, 0]
+            front = np.einsum("ij,ij->i", normals, to_camera) > 0
+            drawn = np.zeros(len(mesh.edges), dtype=bool)
+            drawn[mesh.face_edges[front].reshape(-1)] = True
+
+        # edges crossing the near plane are cut at it instead of being dropped
+        depth_a = mesh.depth[a]
+        depth_b = mesh.depth[b]
+        in_a = depth_a >= camera.near_plane
+        in_b = depth_b >= camera.near_plane
+        drawn &= in_a | in_b
+
+        segments = np.hstack((mesh.screen[a], mesh.screen[b]))
+        clipped = np.flatnonzero(drawn & (in_a ^ in_b))
+        if len(clipped) > 0:
+            start = a[clipped]
+            end = b[clipped]
+            t = (camera.near_plane - mesh.depth[start]) / (mesh.depth[end] - mesh.depth[start])
+            points = world[start] + t[:, np.newaxis] * (world[end] - world[start])
+            screen, _, _ = camera.project_many(points, mesh_position=Vector())
+            behind_a = ~in_a[clipped]
+            segments[clipped[behind_a], 0:2] = screen[behind_a]
+            segments[clipped[~behind_a], 2:4] = screen[~behind_a]
+
+        mesh.draw_segments = (segments, drawn)
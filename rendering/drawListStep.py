@@ -0,0 +1,42 @@
+from typing import List
+
+import numpy as np
+
+from geometry.mesh import Mesh
+from geometry.shading import face_polygons
+from rendering.pipeline_step import PipelineStep
+from scene.scene import Scene
+
+
+class DrawEntry:
+    def __init__(self, uid: int, mesh: Mesh, lines: bool = True):
+        self.uid = uid
+        self.mesh = mesh  # kept for the debug overlay
+        self.culled = mesh.culled
+        self.key = (mesh.projection_key, lines)  # unchanged keys need no canvas work
+        # items for the finest level of detail, so switching levels only hides or shows some of them
+        self.item_count = len((mesh.lods[0] if mesh.lods else mesh).edges) if lines else 0
+        if self.culled or not lines:
+            self.segments = np.empty((0, 4))
+            self.drawn = np.empty(0, dtype=bool)
+        else:
+            self.segments, self.drawn = mesh.segments()
+
+
+class PolygonList:
+    def __init__(self, meshes: List[Mesh]):
+        self.coords, self.colors = face_polygons(meshes)  # back to front
+
+
+class DrawListStep(PipelineStep):
+    def __init__(self, solid: bool = False):
+        super().__init__()
+        self.solid = solid
+
+    def process_scene(self, scene: Scene):
+        scene.draw_list = build_draw_list(scene, lines=not self.solid)
+        scene.polygons = PolygonList([entity.geometry for entity in scene.entities()]) if self.solid else None
+
+
+def build_draw_list(scene: Scene, lines: bool = True) -> List[DrawEntry]:
+    return [DrawEntry(uid=entity.uid, mesh=entity.geometry, lines=lines) for entity in scene.entities()]
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import csv
+from collections import deque
+from typing import Deque, Dict, List
+
+import numpy as np
+
+
+class FrameProfiler:
+    percentiles = (50, 95, 99)
+
+    def __init__(self, size: int = 600):
+        self.frames: Deque[Dict[str, float]] = deque(maxlen=size)  # stage -> seconds, one entry per shown frame
+        self.stages: List[str] = []
+        self.dropped_frames = 0
+
+    def record_frame(self, timings: Dict[str, float], dropped_frames: int):
+        for stage in timings:
+            if stage not in self.stages:
+                self.stages.append(stage)
+        self.frames.append(dict(timings))
+        self.dropped_frames = dropped_frames
+
+    def summary(self) -> Dict[str, Dict[int, float]]:
+        # stage -> percentile -> milliseconds over the frames in the ring buffer
+        stats = {}
+        for stage in self.stages:
+            values = np.array([frame[stage] for frame in self.frames if stage in frame])
+            if len(values) > 0:
+                stats[stage] = dict(zip(self.percentiles, np.percentile(values * 1000, self.percentiles).tolist()))
+        return stats
+
+    def overlay_text(self) -> str:
+        lines = ["{:<12}{:>8}{:>8}{:>8}".format("ms", *("p{}".format(p) for p in self.percentiles))]
+        for stage, values in self.summary().items():
+            lines.append("{:<12}{:>8.2f}{:>8.2f}{:>8.2f}".format(stage, *(values[p] for p in self.percentiles)))
+        lines.append("dropped frames {}".format(self.dropped_frames))
+        return "\n".join(lines)
+
+    def dump_csv(self, file_path: str):
+        with open(file_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.stages)
+            for frame in self.frames:
+                writer.writerow(["" if stage not in frame else "{:.6f}".format(frame[stage]) for stage in self.stages])
@@ -0,0 +1,56 @@
+from time import perf_counter
+from tkinter import Misc
+from typing import Callable, Optional
+
+
+class FrameScheduler:
+    # drives simulation and rendering from the Tk event loop: update(dt) runs at a fixed tick rate,
+    # render(alpha) once per frame slot with alpha in [0, 1) the progress between the last tick and the next one
+    max_ticks_per_frame = 5  # after a stall the simulation skips ahead instead of replaying every missed tick
+
+    def __init__(self, widget: Misc, tick_rate: float, refresh_rate: float,
+                 update: Callable[[float], None], render: Callable[[float], None]):
+        self.widget = widget
+        self.tick = 1.0 / tick_rate
+        self.frame = 1.0 / refresh_rate
+        self.update = update
+        self.render = render
+
+        self.running = False
+        self.job: Optional[str] = None
+        self.accumulator = 0.0
+        self.time = 0.0  # simulated seconds, advanced by whole ticks
+        self.previous = 0.0
+        self.next_frame = 0.0
+
+    def start(self):
+        self.running = True
+        self.previous = perf_counter()
+        self.next_frame = self.previous
+        self.job = self.widget.after(0, self.run_frame)
+
+    def stop(self):
+        self.running = False
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+
+    def run_frame(self):
+        if not self.running:
+            return
+        now = perf_counter()
+        self.accumulator += min(now - self.previous, self.tick * self.max_ticks_per_frame)
+        self.previous = now
+        while self.accumulator >= self.tick:
+            self.update(self.tick)
+            self.accumulator -= self.tick
+            self.time += self.tick
+
+        self.render(self.accumulator / self.tick)
+
+        # sleep until the next slot; a late frame drops the slots it missed rather than rushing to catch up
+        self.next_frame += self.frame
+        now = perf_counter()
+        if self.next_frame <= now:
+            self.next_frame = now + self.frame
+        self.job = self.widget.after(max(1, int((self.next_frame - now) * 1000)), self.run_frame)
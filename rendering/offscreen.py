@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from math import cos, radians, sin
+from typing import List, Optional
+
+import numpy as np
+
+from geometry.camera import Camera
+from geometry.vector import Vector
+from rendering.rasterizer import Rasterizer
+from scene.scene import Scene
+
+frame_formats = ("png", "npy")
+
+
+def turntable(target: Vector, distance: float, frames: int, focal_length: float = 500,
+              viewport_offset: Vector = Vector(), height: float = 0.0) -> List[Camera]:
+    cameras = []
+    for frame in range(frames):
+        angle = 360.0 * frame / frames
+        position = target + Vector(x=sin(radians(angle)) * distance, y=height, z=-cos(radians(angle)) * distance)
+        camera = Camera(position=position, focal_length=focal_length, viewport_offset=viewport_offset)
+        camera.rotate(Vector(y=1), -angle)  # bearing back towards the target
+        cameras.append(camera)
+    return cameras
+
+
+def render_frame(scene: Scene, camera: Camera, rasterizer: Rasterizer) -> np.ndarray:
+    snapshot = scene.snapshot(camera=camera)
+    meshes = [entity.geometry for entity in snapshot.entities()]
+    for mesh in meshes:
+        mesh.project_to(camera=snapshot.camera)
+    return rasterizer.draw_meshes(meshes)
+
+
+def write_png(path: str, frame: np.ndarray):
+    height, width = frame.shape
+    rows = np.hstack((np.zeros((height, 1), dtype=np.uint8), frame))  # filter type 0 on every row
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))  # 8 bit gray
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def write_frame(path: str, frame: np.ndarray, frame_format: str):
+    if frame_format == "png":
+        write_png(path, frame)
+    elif frame_format == "npy":
+        np.save(path, frame)
+    else:
+        raise ValueError("unknown frame format {}, expected one of {}".format(frame_format, frame_formats))
+
+
+class FrameWriter:
+    # one per worker, holds the scene and framebuffers between frames
+    def __init__(self, scene: Scene, width: int, height: int, output: str, frame_format: str):
+        self.scene = scene
+        self.rasterizer = Rasterizer(width, height)
+        self.output = output
+        self.frame_format = frame_format
+
+    def __call__(self, frame: int, camera: Camera) -> str:
+        path = os.path.join(self.output, "frame_{:05d}.{}".format(frame, self.frame_format))
+        write_frame(path, render_frame(self.scene, camera, self.rasterizer), self.frame_format)
+        return path
+
+
+_worker_writer: Optional[FrameWriter] = None
+
+
+def _init_worker(scene: Scene, width: int, height: int, output: str, frame_format: str):
+    global _worker_writer
+    _worker_writer = FrameWriter(scene, width, height, output, frame_format)
+
+
+def _write_in_worker(frame: int, camera: Camera) -> str:
+    return _worker_writer(frame, camera)
+
+
+def render_frames(scene: Scene, cameras: List[Camera], width: int, height: int, output: str,
+                  frame_format: str = "png", workers: int = 0) -> List[str]:
+    if frame_format not in frame_formats:
+        raise ValueError("unknown frame format {}, expected one of {}".format(frame_format, frame_formats))
+    os.makedirs(output, exist_ok=True)
+
+    if workers <= 0:
+        writer = FrameWriter(scene, width, height, output, frame_format)
+        return [writer(frame, camera) for frame, camera in enumerate(cameras)]
+
+    # the scene is sent once per worker process, each frame only ships its camera
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(scene, width, height, output, frame_format)) as executor:
+        return list(executor.map(_write_in_worker, range(len(cameras)), cameras))
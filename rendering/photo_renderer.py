@@ -0,0 +1,15 @@
+from tkinter import Canvas, PhotoImage, NW
+
+import numpy as np
+
+
+class PhotoRenderer:
+    def __init__(self, canvas: Canvas, width: int, height: int):
+        self.canvas = canvas
+        self.header = "P5 {} {} 255\n".format(width, height).encode()
+        self.photo = PhotoImage(master=canvas, width=width, height=height)
+        self.item = canvas.create_image(0, 0, image=self.photo, anchor=NW)
+
+    def render(self, frame: np.ndarray):
+        # the whole gray framebuffer goes to Tk as a single binary PGM blit
+        self.photo.configure(data=self.header + frame.tobytes(), format="PPM")
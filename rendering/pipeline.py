@@ -1,39 +1,62 @@
 from queue import Queue, Empty
-from threading import Thread
+from time import perf_counter
 from typing import List, Optional
 
-from rendering.pipeline_step import PipelineStep
+from rendering.pipeline_step import PipelineStep, offer
 from scene.scene import Scene
 
 
 class Pipeline:
-    input_queue: Queue
-    output_queue = Queue(maxsize=1)
-
     def __init__(self, steps: List[PipelineStep] = []):
+        self.output_queue = Queue(maxsize=1)
         self.input_queue = self.output_queue
-        if len(steps) == 0:
-            return
-        self.steps = steps
+        self.steps = list(steps)
+        self.dropped_frames = 0
+        self.delivered = 0  # snapshots that entered the first stage
+        self.pulled = 0
 
-        for idx in range(len(steps)):
-            step = steps[idx]
+        for idx in range(len(self.steps)):
+            step = self.steps[idx]
             if idx == 0:
                 self.input_queue = step.input_queue
             else:
-                steps[idx - 1].output_queue = step.input_queue
+                self.steps[idx - 1].output_queue = step.input_queue
             step.output_queue = self.output_queue
+
+    def start(self):
+        for step in self.steps:
             step.start()
 
     def stop(self):
         for step in self.steps:
             step.stop()
+        for step in self.steps:
+            if step.is_alive():
+                step.join()
 
     def push_scene(self, scene: Scene):
-        self.input_queue.put(scene)
+        scene.pushed_at = perf_counter()
+        if offer(self.input_queue, scene):
+            self.delivered += 1
+        else:  # a newer snapshot replaces one not picked up yet
+            self.dropped_frames += 1
+
+    def busy(self) -> bool:
+        # a snapshot pushed now would only wait behind the one in flight, or replace it
+        in_flight = self.delivered - self.pulled - sum(step.dropped_frames for step in self.steps)
+        return in_flight > 0
+
+    def dropped(self) -> int:
+        return self.dropped_frames + sum(step.dropped_frames for step in self.steps)
 
     def pull_scene(self) -> Optional[Scene]:
         try:
-            return self.output_queue.get_nowait()
+            scene = self.output_queue.get_nowait()
         except Empty:
             return None
+        self.pulled += 1
+        # whatever the stages did not spend processing was spent waiting in queues
+        latency = perf_counter() - scene.pushed_at
+        scene.timings["queue_wait"] = max(0.0, latency - sum(scene.timings[step.name] for step in self.steps
+                                                             if step.name in scene.timings))
+        return scene
@@ -1,22 +1,24 @@
 from abc import ABC, abstractmethod
 from queue import Queue, Empty, Full
 from threading import Thread
+from time import perf_counter
 from typing import Optional
 
 from scene.scene import Scene
 
 
 class PipelineStep(ABC, Thread):
-    input_queue = Queue(maxsize=1)
-    output_queue: Queue = None
-    running: bool = False
-
     def __init__(self):
-        super().__init__()
+        super().__init__(daemon=True)
+        self.input_queue = Queue(maxsize=1)
+        self.output_queue: Optional[Queue] = None
+        self.running = False
+        self.name = type(self).__name__.replace("Step", "").lower()
+        self.dropped_frames = 0
 
-    def fetch_scene(self) -> Scene:
+    def fetch_scene(self) -> Optional[Scene]:
         scene = None
-        while scene is None:
+        while scene is None and self.running:
             try:
                 scene = self.input_queue.get(block=True, timeout=0.5)
             except Empty:
@@ -27,21 +29,21 @@ class PipelineStep(ABC, Thread):
     def send_scene(self, scene: Scene):
         if self.output_queue is None:
             return
-        if self.output_queue.full():
-            try:
-                self.output_queue.get()  # discard one from head to make room; frame loss
-            except Full:
-                pass
-        try:
-            self.output_queue.put_nowait(scene)
-        except Full:
-            pass
+        if not offer(self.output_queue, scene):
+            self.dropped_frames += 1
 
-    def run(self):
+    def start(self):
         self.running = True
+        super().start()
+
+    def run(self):
         while self.running:
             scene = self.fetch_scene()
+            if scene is None:
+                break
+            start = perf_counter()
             self.process_scene(scene=scene)
+            scene.timings[self.name] = perf_counter() - start
             self.send_scene(scene=scene)
 
     def stop(self):
@@ -50,3 +52,18 @@ class PipelineStep(ABC, Thread):
     @abstractmethod
     def process_scene(self, scene: Scene):
         pass
+
+
+def offer(queue: Queue, scene: Scene) -> bool:
+    delivered = True
+    if queue.full():
+        try:
+            queue.get_nowait()  # discard one from head to make room; frame loss
+            delivered = False
+        except Empty:
+            pass
+    try:
+        queue.put_nowait(scene)
+    except Full:
+        delivered = False
+    return delivered
@@ -1,17 +1,57 @@
+from concurrent.futures import Executor
+from typing import Dict, Optional
+
 from geometry.camera import Camera
+from geometry.mesh import Mesh, project_instances
 from rendering.pipeline_step import PipelineStep
 from scene.scene import Scene
 
 
 class ProjectionStep(PipelineStep):
-    def __init__(self, camera: Camera):
+    def __init__(self, camera: Camera, executor: Optional[Executor] = None):
         super().__init__()
         self.camera = camera
+        self.executor = executor
+        self.projected: Dict[int, Mesh] = {}  # entity uid -> last projected mesh
 
     def process_scene(self, scene: Scene):
+        camera = scene.camera or self.camera
         ent = scene.entities()
-        mhs = [entity.geometry for entity in ent]
 
-        for idx, mesh in enumerate(mhs):
-            mesh.project_to(camera=self.camera)
-        pass
+        # meshes and camera unchanged since their last projection reuse its buffers
+        stale = []
+        for entity in ent:
+            previous = self.projected.get(entity.uid)
+            if previous is not None and previous.projection_key == entity.geometry.projection_version(camera):
+                reuse_projection(entity.geometry, previous)
+            else:
+                stale.append(entity)
+
+        # the index rules out whole groups of entities at once, the rest still get their own frustum test
+        if stale and scene.index.uids:
+            in_view = scene.index.query_frustum(camera)
+            indexed = scene.index.slots
+            outside = [entity for entity in stale if entity.uid in indexed and entity.uid not in in_view]
+            for entity in outside:
+                entity.geometry.set_culled(camera)
+            stale = [entity for entity in stale if entity.uid not in indexed or entity.uid in in_view]
+
+        # with an executor, one task per shared geometry
+        project_instances([entity.geometry for entity in stale], camera, self.executor)
+
+        self.projected = {entity.uid: entity.geometry for entity in ent}
+
+    def run(self):
+        super().run()
+        # shut down once the last frame is projected, not while one may still be submitting tasks
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+def reuse_projection(mesh: Mesh, projected: Mesh):
+    if projected.lod != mesh.lod:
+        mesh.use_lod(projected.lod)
+    mesh.screen, mesh.depth, mesh.visible = projected.screen, projected.depth, projected.visible
+    mesh.culled, mesh.projection_key = projected.culled, projected.projection_key
+    mesh.center_projection = projected.center_projection
+    mesh.draw_segments = None
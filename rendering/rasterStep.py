@@ -0,0 +1,13 @@
+from rendering.pipeline_step import PipelineStep
+from rendering.rasterizer import Rasterizer
+from scene.scene import Scene
+
+
+class RasterStep(PipelineStep):
+    def __init__(self, width: int, height: int):
+        super().__init__()
+        self.rasterizer = Rasterizer(width, height)
+
+    def process_scene(self, scene: Scene):
+        # the Tk thread may still be blitting the previous frame, hand it its own buffer
+        scene.frame = self.rasterizer.draw_meshes([entity.geometry for entity in scene.entities()]).copy()
@@ -0,0 +1,99 @@
+from typing import Iterable
+
+import numpy as np
+
+from geometry.mesh import Mesh
+from geometry.shading import shaded_faces
+
+
+class Rasterizer:
+    chunk_budget = 1 << 18  # covered pixels filled at once
+
+    def __init__(self, width: int, height: int, background: int = 255):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.frame = np.empty((height, width), dtype=np.uint8)  # gray levels
+        self.depth = np.empty((height, width))  # inverse depth, 0 is empty
+
+    def clear(self):
+        self.frame.fill(self.background)
+        self.depth.fill(0.0)
+
+    def draw_meshes(self, meshes: Iterable[Mesh]) -> np.ndarray:
+        self.clear()
+        screens, depths, levels = shaded_faces(meshes)
+        self.draw_triangles(screens, 1.0 / depths, levels)
+        return self.frame
+
+    def draw_triangles(self, screens: np.ndarray, inverse_depths: np.ndarray, levels: np.ndarray):
+        a, b, c = screens[:, 0], screens[:, 1], screens[:, 2]
+        det = (b[:, 1] - c[:, 1]) * (a[:, 0] - c[:, 0]) + (c[:, 0] - b[:, 0]) * (a[:, 1] - c[:, 1])
+
+        lower = np.floor(screens.min(axis=1)).astype(int)
+        upper = np.ceil(screens.max(axis=1)).astype(int)
+        on_screen = (upper[:, 0] >= 0) & (upper[:, 1] >= 0) \
+            & (lower[:, 0] < self.width) & (lower[:, 1] < self.height) & (det != 0)
+        selected = np.flatnonzero(on_screen)
+        a, b, c, det = a[selected], b[selected], c[selected], det[selected]
+        lower = np.maximum(lower[selected], 0)
+        upper = np.minimum(upper[selected], (self.width - 1, self.height - 1))
+
+        # barycentric weights and 1 / depth are affine in screen space, value = dx * x + dy * y + d0
+        weights = np.empty((len(selected), 3, 3))  # (triangle, weight, (dx, dy, d0))
+        weights[:, 0, 0] = (b[:, 1] - c[:, 1]) / det
+        weights[:, 0, 1] = (c[:, 0] - b[:, 0]) / det
+        weights[:, 1, 0] = (c[:, 1] - a[:, 1]) / det
+        weights[:, 1, 1] = (a[:, 0] - c[:, 0]) / det
+        weights[:, :2, 2] = -weights[:, :2, 0] * c[:, np.newaxis, 0] - weights[:, :2, 1] * c[:, np.newaxis, 1]
+        weights[:, 2] = -weights[:, 0] - weights[:, 1]
+        weights[:, 2, 2] += 1
+        z = inverse_depths[selected]
+        plane = weights[:, 0] * (z[:, 0] - z[:, 2])[:, np.newaxis] + weights[:, 1] * (z[:, 1] - z[:, 2])[:, np.newaxis]
+        plane[:, 2] += z[:, 2]
+
+        # one span per covered row: x where all three weights are >= 0
+        heights = upper[:, 1] - lower[:, 1] + 1
+        triangle = np.repeat(np.arange(len(selected)), heights)
+        y = np.arange(len(triangle)) - np.repeat(np.cumsum(heights) - heights, heights) + lower[triangle, 1]
+        slope = weights[triangle, :, 0]
+        offset = weights[triangle, :, 1] * y[:, np.newaxis] + weights[triangle, :, 2]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            root = -offset / slope
+        root = np.where(slope > 0, root, np.where((slope == 0) & (offset < 0), np.inf, -np.inf)).max(axis=1), \
+            np.where(slope < 0, root, np.where((slope == 0) & (offset < 0), -np.inf, np.inf)).min(axis=1)
+        eps = 1e-9  # pixels on an edge belong to the triangle
+        start = np.maximum(np.ceil(root[0] - eps), lower[triangle, 0])
+        end = np.minimum(np.floor(root[1] + eps), upper[triangle, 0])
+        spans = np.flatnonzero(end >= start)
+        triangle, y, start = triangle[spans], y[spans], start[spans].astype(int)
+        lengths = end[spans].astype(int) - start + 1
+
+        # rows are filled in chunks of about chunk_budget pixels
+        totals = np.cumsum(lengths)
+        first = 0
+        while first < len(lengths):
+            done = totals[first - 1] if first > 0 else 0
+            last = max(first + 1, int(np.searchsorted(totals, done + self.chunk_budget, side="right")))
+            rows = slice(first, last)
+            self.fill_spans(triangle[rows], y[rows], start[rows], lengths[rows], plane, levels[selected])
+            first = last
+
+    def fill_spans(self, triangle: np.ndarray, y: np.ndarray, start: np.ndarray, lengths: np.ndarray,
+                   plane: np.ndarray, levels: np.ndarray):
+        # pixels start .. start + length - 1 of row y for every span, depth tested against the buffer
+        row_z = plane[triangle, 0] * start + plane[triangle, 1] * y + plane[triangle, 2]
+        # offset of every pixel in its span, a running count restarting at each span
+        x = np.ones(int(lengths.sum()), dtype=int)
+        x[0] = 0
+        x[np.cumsum(lengths[:-1])] = 1 - lengths[:-1]
+        np.cumsum(x, out=x)
+        z = np.repeat(plane[triangle, 0], lengths) * x
+        z += np.repeat(row_z, lengths)
+        pixels = np.repeat(y * self.width + start, lengths)
+        pixels += x
+
+        depth = self.depth.reshape(-1)
+        np.maximum.at(depth, pixels, z)
+        nearest = z >= depth[pixels]
+        self.frame.reshape(-1)[pixels[nearest]] = np.repeat(levels[triangle], lengths)[nearest]
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from geometry import matrix, next_version
+from geometry.quaternion import Quaternion
+from geometry.vector import Vector
+
+Pose = Tuple[Optional[Vector], Optional[Quaternion]]  # offset from the entity's center and rotation around it
+
+
+class Spin:
+    # constant angular velocity, in degrees per second
+    def __init__(self, axis: Vector, speed: float):
+        self.axis = axis
+        self.speed = speed
+
+    def evaluate(self, time: float) -> Pose:
+        # from the start angle every time, so no error builds up over a long run
+        return None, Quaternion.axis_angle(self.axis, self.speed * time)
+
+
+class Track:
+    # keyframes (time, offset, rotation), offsets interpolated linearly and rotations along the shortest arc;
+    # either may be None on every keyframe of a track that does not animate it
+    def __init__(self, keyframes: List[Tuple[float, Optional[Vector], Optional[Quaternion]]], loop: bool = False):
+        assert keyframes, "a track needs at least one keyframe"
+        self.keyframes = sorted(keyframes, key=lambda keyframe: keyframe[0])
+        self.times = [keyframe[0] for keyframe in self.keyframes]
+        self.loop = loop
+
+    def evaluate(self, time: float) -> Pose:
+        start, end = self.times[0], self.times[-1]
+        if self.loop and end > start:
+            time = start + (time - start) % (end - start)
+
+        idx = bisect_right(self.times, time)
+        if idx == 0:
+            return self.keyframes[0][1:]
+        if idx == len(self.keyframes):
+            return self.keyframes[-1][1:]
+
+        t0, offset0, rotation0 = self.keyframes[idx - 1]
+        t1, offset1, rotation1 = self.keyframes[idx]
+        u = (time - t0) / (t1 - t0)
+        offset = None if offset0 is None else (offset0 * (1 - u)).iadd(offset1 * u)
+        rotation = None if rotation0 is None else Quaternion.slerp(rotation0, rotation1, u)
+        return offset, rotation
+
+
+class Animator:
+    # animations of entities, evaluated on snapshot copies so the scene's own meshes are never rewritten
+    def __init__(self):
+        self.animations: Dict[int, object] = {}  # entity uid -> Spin, Track or anything with evaluate(time)
+        self.poses: Dict[int, Tuple[tuple, int]] = {}  # entity uid -> last evaluated pose and its mesh version
+
+    def add(self, uid: int, animation):
+        self.animations[uid] = animation
+        self.poses.pop(uid, None)
+
+    def remove(self, uid: int):
+        self.animations.pop(uid, None)
+        self.poses.pop(uid, None)
+
+    def apply(self, entities: List, time: float):
+        for entity in entities:
+            animation = self.animations.get(entity.uid)
+            if animation is None:
+                continue
+            offset, rotation = animation.evaluate(time)
+            mesh = entity.geometry
+
+            # an unchanged pose keeps its version, so a finished track costs no projection
+            key = (mesh.version,
+                   None if offset is None else (offset.x, offset.y, offset.z),
+                   None if rotation is None else (rotation.w, rotation.axis.x, rotation.axis.y, rotation.axis.z))
+            last = self.poses.get(entity.uid)
+            version = last[1] if last is not None and last[0] == key else next_version()
+            self.poses[entity.uid] = (key, version)
+
+            if rotation is not None:
+                turn = matrix.from_quaternion(rotation)
+                mesh.orientation = turn if mesh.orientation is None else turn @ mesh.orientation
+            if offset is not None:
+                mesh.set_center(mesh.center + offset)
+            mesh.version = version
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from copy import copy
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from geometry.camera import Camera
+from scene.entity import Entity
+
+
+def entity_bounds(entity: Entity) -> np.ndarray:
+    _, _, corners = entity.geometry.world_bounds()
+    return np.stack((corners.min(axis=0), corners.max(axis=0)))
+
+
+class BVH:
+    # bounding volume hierarchy over entity world boxes, stored as flat arrays;
+    # arrays are replaced instead of written in place, so a shallow copy is a stable snapshot
+    leaf_size = 4
+
+    def __init__(self):
+        self.uids: List[int] = []  # slot -> entity uid
+        self.slots: Dict[int, int] = {}  # entity uid -> slot
+        self.keys: Dict[int, Tuple[int, int]] = {}  # entity uid -> (mesh, placement) versions of its bounds
+        self.bounds = np.empty((0, 2, 3))  # slot -> world aabb
+        self.order = np.empty(0, dtype=int)  # slots grouped by leaf
+        self.leaf_of = np.empty(0, dtype=int)  # slot -> leaf node
+
+        self.node_bounds = np.empty((0, 2, 3))
+        self.node_children = np.empty((0, 2), dtype=int)  # -1 for leaves
+        self.node_start = np.empty(0, dtype=int)  # leaf range in order
+        self.node_count = np.empty(0, dtype=int)
+        self.node_parent = np.empty(0, dtype=int)
+
+    def copy(self) -> BVH:
+        index = copy(self)
+        index.keys = dict(self.keys)
+        return index
+
+    def update(self, entities: List[Entity]):
+        # rebuilds when entities were added or removed, otherwise refits the boxes of the ones that changed
+        if len(entities) != len(self.uids) or any(entity.uid not in self.slots for entity in entities):
+            self.build(entities)
+            return
+
+        changed = []
+        for entity in entities:
+            key = (entity.geometry.version, entity.geometry.world_version)
+            if self.keys[entity.uid] != key:
+                self.keys[entity.uid] = key
+                changed.append(entity)
+        if changed:
+            self.refit(changed)
+
+    def build(self, entities: List[Entity]):
+        self.uids = [entity.uid for entity in entities]
+        self.slots = {uid: slot for slot, uid in enumerate(self.uids)}
+        self.keys = {entity.uid: (entity.geometry.version, entity.geometry.world_version) for entity in entities}
+        self.bounds = np.array([entity_bounds(entity) for entity in entities]).reshape(-1, 2, 3)
+        self.order = np.arange(len(entities))
+        self.leaf_of = np.zeros(len(entities), dtype=int)
+
+        node_bounds, children, node_start, node_count, node_parent = [], [], [], [], []
+        centroids = self.bounds.mean(axis=1)
+        stack = [(0, len(entities), -1)]
+        while stack:
+            start, end, parent = stack.pop()
+            node = len(node_bounds)
+            slots = self.order[start:end]
+            if end > start:
+                node_bounds.append((self.bounds[slots, 0].min(axis=0), self.bounds[slots, 1].max(axis=0)))
+            else:
+                node_bounds.append(np.zeros((2, 3)))
+            children.append([])
+            node_start.append(start)
+            node_count.append(end - start)
+            node_parent.append(parent)
+            if parent >= 0:
+                children[parent].append(node)
+
+            if end - start <= self.leaf_size:
+                self.leaf_of[slots] = node
+                continue
+
+            # median split along the axis the centroids spread the most
+            axis = int(np.argmax(np.ptp(centroids[slots], axis=0)))
+            self.order[start:end] = slots[np.argsort(centroids[slots, axis], kind="stable")]
+            middle = (start + end) // 2
+            stack.append((middle, end, node))
+            stack.append((start, middle, node))
+
+        self.node_bounds = np.array(node_bounds).reshape(-1, 2, 3)
+        self.node_children = np.array([pair or [-1, -1] for pair in children], dtype=int).reshape(-1, 2)
+        self.node_start = np.array(node_start, dtype=int)
+        self.node_count = np.array(node_count, dtype=int)
+        self.node_parent = np.array(node_parent, dtype=int)
+
+    def refit(self, entities: List[Entity]):
+        bounds = self.bounds.copy()
+        node_bounds = self.node_bounds.copy()
+        dirty: Set[int] = set()
+        for entity in entities:
+            slot = self.slots[entity.uid]
+            bounds[slot] = entity_bounds(entity)
+            dirty.add(int(self.leaf_of[slot]))
+
+        # leaves first, then every ancestor once, deepest first
+        for leaf in dirty:
+            slots = self.order[self.node_start[leaf]:self.node_start[leaf] + self.node_count[leaf]]
+            node_bounds[leaf] = (bounds[slots, 0].min(axis=0), bounds[slots, 1].max(axis=0))
+        parents = set()
+        for leaf in dirty:
+            parent = int(self.node_parent[leaf])
+            while parent >= 0 and parent not in parents:
+                parents.add(parent)
+                parent = int(self.node_parent[parent])
+        for node in sorted(parents, reverse=True):  # children always come after their parent
+            children = node_bounds[self.node_children[node]]
+            node_bounds[node] = (children[:, 0].min(axis=0), children[:, 1].max(axis=0))
+
+        self.bounds, self.node_bounds = bounds, node_bounds
+
+    def children(self, node: int) -> List[int]:
+        return [] if self.node_children[node, 0] < 0 else self.node_children[node].tolist()
+
+    def leaf_uids(self, node: int) -> List[int]:
+        start = self.node_start[node]
+        return [self.uids[slot] for slot in self.order[start:start + self.node_count[node]].tolist()]
+
+    def query_frustum(self, camera: Camera) -> Set[int]:
+        # uids of the entities whose box may be in view, one level of the tree per step
+        found: Set[int] = set()
+        if not self.uids:
+            return found
+        planes = camera.world_frustum_planes()
+        nodes = np.zeros(1, dtype=int)
+        while len(nodes):
+            nodes = nodes[boxes_in_view(self.node_bounds[nodes], planes)]
+            leaves = self.node_children[nodes, 0] < 0
+            for node in nodes[leaves].tolist():
+                start = self.node_start[node]
+                slots = self.order[start:start + self.node_count[node]]
+                found.update(self.uids[slot] for slot in slots[boxes_in_view(self.bounds[slots], planes)].tolist())
+            nodes = self.node_children[nodes[~leaves]].ravel()
+        return found
+
+    def query_ray(self, origin: np.ndarray, direction: np.ndarray) -> List[Tuple[float, int]]:
+        # (entry distance, uid) of every entity box the ray passes through, nearest first
+        hits = []
+        if not self.uids:
+            return hits
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse = 1.0 / direction
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if slab_entry(self.node_bounds[node], origin, inverse) is None:
+                continue
+            children = self.children(node)
+            if children:
+                stack.extend(children)
+                continue
+            start = self.node_start[node]
+            for slot in self.order[start:start + self.node_count[node]].tolist():
+                entry = slab_entry(self.bounds[slot], origin, inverse)
+                if entry is not None:
+                    hits.append((entry, self.uids[slot]))
+        return sorted(hits)
+
+
+def boxes_in_view(bounds: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    # conservative test of boxes (K, 2, 3): a box is out only if it lies fully behind one of the planes
+    center = bounds.mean(axis=1)
+    extent = (bounds[:, 1] - bounds[:, 0]) / 2
+    reach = center @ planes[:, :3].T + planes[:, 3] + extent @ np.abs(planes[:, :3]).T
+    return np.all(reach >= 0, axis=1)
+
+
+def slab_entry(bounds: np.ndarray, origin: np.ndarray, inverse: np.ndarray):
+    # distance at which the ray enters the box, None when it misses or the box is behind
+    with np.errstate(invalid="ignore"):
+        t1 = (bounds[0] - origin) * inverse
+        t2 = (bounds[1] - origin) * inverse
+    # a ray parallel to a slab gives nan when its origin lies on the slab plane, that slab does not limit it
+    near = np.nanmax(np.where(np.isnan(t1), -np.inf, np.minimum(t1, t2)))
+    far = np.nanmin(np.where(np.isnan(t1), np.inf, np.maximum(t1, t2)))
+    if far < max(near, 0.0):
+        return None
+    return max(float(near), 0.0)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+from itertools import count
+
 from geometry.mesh import Mesh
 
+_entity_ids = count()
+
 
 class Entity:
-    def __init__(self, geometry: Mesh):
+    def __init__(self, geometry: Mesh, uid: int = None):
         self.geometry = geometry
+        self.uid = next(_entity_ids) if uid is None else uid  # shared by every snapshot copy of this entity
 
     def copy(self) -> Entity:
-        return Entity(self.geometry.copy())
+        return Entity(self.geometry.copy(), uid=self.uid)
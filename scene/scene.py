@@ -1,6 +1,9 @@
 from __future__ import annotations
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
+from geometry.camera import Camera
+from scene.animation import Animator
+from scene.bvh import BVH
 from scene.entity import Entity
 from scene.scene_node import SceneNode
 
@@ -8,15 +11,27 @@ from scene.scene_node import SceneNode
 class Scene:
     def __init__(self):
         self.scene_root = SceneNode()
+        self.camera: Optional[Camera] = None  # camera state a snapshot is rendered with
+        self.draw_list = None  # filled by the rendering pipeline
+        self.polygons = None  # filled by the rendering pipeline in solid mode
+        self.frame = None  # filled by the rendering pipeline with the raster renderer
+        self.timings: Dict[str, float] = {}  # stage -> seconds spent on this snapshot
+        self.pushed_at = 0.0
+        self.index = BVH()  # entity bounds, refreshed when a snapshot is taken
+        self.animator = Animator()
 
     def meshes(self):
         pass
 
+    def version(self) -> int:
+        # newest change to the node structure, node transforms or to any mesh
+        return max([self.scene_root.version] + [entity.geometry.version for entity in self.entities()])
+
     def entities(self):
         return self.entities_from_node(self.scene_root)
 
     def entities_from_node(self, node: SceneNode) -> List[Entity]:
-        entities = node.entities
+        entities = list(node.entities)
         for n in node.childs:
             entities.extend(self.entities_from_node(n))
 
@@ -26,5 +41,36 @@ class Scene:
         copy = Scene()
 
         copy.scene_root = self.scene_root.copy()
+        copy.index = self.index.copy()
 
         return copy
+
+    def animate(self, entity: Entity, animation):
+        self.animator.add(entity.uid, animation)
+
+    def snapshot(self, camera: Camera, time: float = 0.0) -> Scene:
+        # animations are evaluated at time on the copies only
+        self.index.update(self.entities())
+        copy = self.copy()
+        copy.camera = camera.copy()
+        if self.animator.animations:
+            entities = copy.entities()
+            self.animator.apply(entities, time)
+            copy.index.update(entities)  # refits the animated ones
+        return copy
+
+    def pick(self, x: float, y: float) -> Optional[Tuple[Entity, float]]:
+        # nearest entity under screen point x, y of this snapshot's camera and its distance
+        if self.camera is None:
+            return None
+        origin, direction = self.camera.ray(x, y)
+        entities = {entity.uid: entity for entity in self.entities()}
+        best = None
+        for entry, uid in self.index.query_ray(origin, direction):
+            if best is not None and entry > best[1]:
+                break  # boxes are sorted by entry, no farther one can hold a closer face
+            entity = entities.get(uid)
+            distance = None if entity is None else entity.geometry.intersect(origin, direction)
+            if distance is not None and (best is None or distance < best[1]):
+                best = (entity, distance)
+        return best
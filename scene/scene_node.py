@@ -1,27 +1,99 @@
 from __future__ import annotations
 
+from typing import Optional
+
+import numpy as np
+
+from geometry import matrix, next_version
+from geometry.quaternion import Quaternion
+from geometry.vector import Vector
 from scene.entity import Entity
 
 
 class SceneNode:
-    def __init__(self, parent: SceneNode = None):
+    def __init__(self, parent: SceneNode = None, position: Vector = Vector(), rotation: Quaternion = None):
         self.parent = parent
         if parent is not None:
             parent.register_child(self)
 
         self.childs = []
         self.entities = []
+        self.version = next_version()
+
+        # local transform relative to the parent, the world matrix is derived lazily
+        self.position = position.copy()
+        self.rotation = Quaternion.identity() if rotation is None else rotation
+        self._world: Optional[np.ndarray] = None
+        self.world_version = next_version()
+
+    def touch(self):
+        # a change anywhere in the subtree is visible from its ancestors
+        version = next_version()
+        node = self
+        while node is not None:
+            node.version = version
+            node = node.parent
+
+    def invalidate(self):
+        # only this subtree depends on the changed transform
+        version = next_version()
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            node._world = None
+            node.world_version = version
+            node.place_entities()
+            nodes.extend(node.childs)
+        self.touch()
+
+    def translate(self, v: Vector) -> SceneNode:
+        self.position.translate(v)
+        self.invalidate()
+        return self
+
+    def rotate(self, rotation: Quaternion) -> SceneNode:
+        self.rotation = rotation * self.rotation
+        self.invalidate()
+        return self
+
+    def set_transform(self, position: Vector, rotation: Quaternion) -> SceneNode:
+        self.position = position.copy()
+        self.rotation = rotation
+        self.invalidate()
+        return self
+
+    def world_matrix(self) -> np.ndarray:
+        if self._world is None:
+            local = matrix.transform(self.rotation.to_matrix(), self.position)
+            self._world = local if self.parent is None else matrix.compose(self.parent.world_matrix(), local)
+        return self._world
+
+    def placement(self):
+        # meshes under an untransformed chain keep the cheaper placement without a matrix
+        world = self.world_matrix()
+        return None if np.array_equal(world, np.identity(4)) else world, self.world_version
+
+    def place_entities(self):
+        matrix, version = self.placement()
+        for entity in self.entities:
+            entity.geometry.place(matrix, version)
 
     def add_entity(self, entity: Entity):
         self.entities.append(entity)
+        entity.geometry.place(*self.placement())
+        self.touch()
 
     def register_child(self, child: SceneNode):
         self.childs.append(child)
+        self.touch()
 
     def copy(self, parent: SceneNode = None) -> SceneNode:
-        copy = SceneNode(parent=parent)
+        copy = SceneNode(parent=parent, position=self.position, rotation=self.rotation)
+        copy._world = self.world_matrix()
+        copy.world_version = self.world_version
 
-        [copy.add_entity(entity=entity.copy()) for entity in self.entities]
+        copy.entities = [entity.copy() for entity in self.entities]  # mesh copies keep their placement
         [child.copy(copy) for child in self.childs]
+        copy.version = self.version
 
         return copy
@@ -1,75 +1,27 @@
+import numpy as np
+
 from geometry.mesh import Mesh
 from geometry.vector import Vector
 
 
 class Cube(Mesh):
     def __init__(self, origin: Vector = Vector(), cube_size=10):
-        center = Vector(
-            x=cube_size / 2,
-            y=cube_size / 2,
-            z=cube_size / 2,
-        )
-
-        vertices = {
-            "A": Vector("A", 0, 0, 0) - center,
-            "B": Vector("B", 0, cube_size, 0) - center,
-            "C": Vector("C", cube_size, cube_size, 0) - center,
-            "D": Vector("D", cube_size, 0, 0) - center,
-            "E": Vector("E", 0, 0, cube_size) - center,
-            "F": Vector("F", 0, cube_size, cube_size) - center,
-            "G": Vector("G", cube_size, cube_size, cube_size) - center,
-            "H": Vector("H", cube_size, 0, cube_size) - center,
-        }
-
-        triangles = [
-            vertices["A"],
-            vertices["B"],
-            vertices["D"],
-
-            vertices["B"],
-            vertices["C"],
-            vertices["D"],
-
-            vertices["D"],
-            vertices["C"],
-            vertices["H"],
-
-            vertices["C"],
-            vertices["G"],
-            vertices["H"],
-
-            vertices["H"],
-            vertices["G"],
-            vertices["E"],
-
-            vertices["G"],
-            vertices["F"],
-            vertices["E"],
-
-            vertices["E"],
-            vertices["F"],
-            vertices["A"],
-
-            vertices["F"],
-            vertices["B"],
-            vertices["A"],
-
-            vertices["E"],
-            vertices["A"],
-            vertices["H"],
-
-            vertices["A"],
-            vertices["D"],
-            vertices["H"],
-
-            vertices["B"],
-            vertices["F"],
-            vertices["C"],
-
-            vertices["F"],
-            vertices["G"],
-            vertices["C"],
-        ]
-
-        super().__init__(*triangles)
+        labels = ["A", "B", "C", "D", "E", "F", "G", "H"]
+        corners = np.array([
+            (0, 0, 0),  # A
+            (0, 1, 0),  # B
+            (1, 1, 0),  # C
+            (1, 0, 0),  # D
+            (0, 0, 1),  # E
+            (0, 1, 1),  # F
+            (1, 1, 1),  # G
+            (1, 0, 1),  # H
+        ], dtype=float)
+        positions = corners * cube_size - cube_size / 2
+
+        triangles = ["ABD", "BCD", "DCH", "CGH", "HGE", "GFE", "EFA", "FBA", "EAH", "ADH", "BFC", "FGC"]
+        faces = np.array([[labels.index(vertex) for vertex in triangle] for triangle in triangles], dtype=int)
+
+        super().__init__()
+        self.set_buffers(positions=positions, faces=faces, labels=labels)
         self.set_center(origin)
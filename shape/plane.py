@@ -1,25 +1,29 @@
+import numpy as np
+
 from geometry.mesh import Mesh
 from geometry.vector import Vector
 
 
 class Plane(Mesh):
     def __init__(self, origin: Vector = Vector(), grid_size=10.0, length: int = 10):
-        vertices = [[Vector(x=float(x*grid_size), y=float(y*grid_size)) for x in range(length+1)] for y in range(length+1)]
+        side = length + 1
+        ys, xs = np.mgrid[0:side, 0:side]
+        positions = np.zeros((side * side, 3))
+        positions[:, 0] = xs.reshape(-1) * grid_size
+        positions[:, 1] = ys.reshape(-1) * grid_size
 
-        trianglesList = []
-        for y in range(len(vertices)-1):
-            for x in range(len(vertices[y])):
-                if x == 0:
-                    continue  # skip first column
-                # first triangle
-                trianglesList.append(vertices[y][x])
-                trianglesList.append(vertices[y][x - 1])
-                trianglesList.append(vertices[y + 1][x - 1])
+        # one quad per cell, its corners indexed into the row-major grid
+        index = np.arange(side * side).reshape(side, side)
+        top_right = index[:-1, 1:].reshape(-1)
+        top_left = index[:-1, :-1].reshape(-1)
+        bottom_left = index[1:, :-1].reshape(-1)
+        bottom_right = index[1:, 1:].reshape(-1)
 
-                # second triangle
-                trianglesList.append(vertices[y][x])
-                trianglesList.append(vertices[y + 1][x - 1])
-                trianglesList.append(vertices[y + 1][x])
+        faces = np.empty((2 * len(top_right), 3), dtype=int)
+        faces[0::2] = np.stack((top_right, top_left, bottom_left), axis=1)  # first triangle
+        faces[1::2] = np.stack((top_right, bottom_left, bottom_right), axis=1)  # second triangle
 
-        super().__init__(*trianglesList)
+        super().__init__()
+        self.set_buffers(positions=positions, faces=faces)
+        self.double_sided = True
         self.set_center(origin)